@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+Benchmark of the link cost evaluation: re-parsing the formula on every call (the old
+EdgeRC.eval_cost), the formulas compiled once by CostFunction and the vectorized CostEngine.
+
+Usage:
+    python benchmarks/cost_functions.py [-f NETWORK_FILE] [-n EDGES] [-s STEPS]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from py_expression_eval import Parser
+from modules.experiment.classes import CostFunction, EdgeRC
+from modules.experiment.costs import CostEngine
+
+
+def synthetic_edges(num_edges):
+    """
+    Edges with BPR and linear formulas already simplified, the way read_infos builds them.
+    """
+    bpr = ('t*(1+0.15*(f/c)^4)', ['f'])
+    linear = ('a+b*f', ['f'])
+    edges = []
+    for i in range(num_edges):
+        if i % 2 == 0:
+            template = bpr
+            constants = {'t': float(random.randint(1, 20)), 'c': float(random.randint(50, 500))}
+        else:
+            template = linear
+            constants = {'a': float(random.randint(1, 20)), 'b': random.random()}
+        formula = Parser().parse(template[0]).simplify(constants).toString()
+        edges.append(EdgeRC(str(i), str(i), str(i + 1), 0.0, formula, template, constants))
+    return edges
+
+
+def network_edges(net_file):
+    """
+    Edges of a network file.
+    """
+    import modules.functions.functions as utils
+    _, edges, _ = utils.read_infos(net_file, flow=0)
+    return edges
+
+
+def reparse(formula, flow):
+    parser = Parser()
+    expression = parser.parse(formula)
+    return expression.evaluate({'f': flow})
+
+
+def measure(evaluators, flows):
+    start = time.time()
+    for flow in flows:
+        for evaluate in evaluators:
+            evaluate(flow)
+    elapsed = time.time() - start
+    return len(flows) * len(evaluators) / elapsed
+
+
+def main():
+    prs = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                  description="Link cost evaluation benchmark.")
+    prs.add_argument("-f", dest="file", help="Network file to take the formulas from.\n")
+    prs.add_argument("-n", "--edges", type=int, default=2500,
+                     help="Number of synthetic edges when no network file is given.\n")
+    prs.add_argument("-s", "--steps", type=int, default=5,
+                     help="Number of simulated steps (one evaluation per edge each).\n")
+    args = prs.parse_args()
+
+    random.seed(0)
+    if args.file:
+        edges = network_edges(args.file)
+    else:
+        edges = synthetic_edges(args.edges)
+    formulas = [edge.function for edge in edges]
+    flows = [float(random.randint(0, 1000)) for _ in range(args.steps)]
+
+    before = measure([lambda flow, formula=formula: reparse(formula, flow)
+                      for formula in formulas], flows)
+    compiled = [CostFunction.get(formula) for formula in formulas]
+    after = measure(compiled, flows)
+
+    engine = CostEngine(edges)
+    start = time.time()
+    for flow in flows:
+        engine.evaluate([flow] * engine.num_edges)
+    vectorized = len(flows) * engine.num_edges / (time.time() - start)
+
+    print("Edges: {0}\tDistinct formulas: {1}\tTemplates: {2}\tPer-edge fallbacks: {3}".format(
+        len(formulas), len(set(formulas)), len(engine.groups), len(engine.fallback)))
+    print("Re-parsing every call: {0:12.0f} evaluations/s".format(before))
+    print("Compiled once:         {0:12.0f} evaluations/s  ({1:.1f}x)".format(after, after / before))
+    print("Vectorized engine:     {0:12.0f} evaluations/s  ({1:.1f}x)".format(vectorized,
+                                                                          vectorized / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+Regression check of the native GA scoring the children from the flows of their parents
+(PopulationFlows): after every generation, the scores of the population are compared with a full
+evaluation (population_average_travel_times), and the individuals with the same genome must
+have the same score. It also times the GA with and without the delta evaluation.
+
+Usage:
+    python benchmarks/ga_delta.py -f NETWORK_FILE [-k K] [-g GENERATIONS] [-p POPULATION]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+
+from modules.experiment.experiment import Experiment
+from modules.experiment.incidence import PopulationFlows
+from modules.genetic_algorithm.array_ga import ArrayGA
+
+
+class Check(object):
+    """
+    Step callback comparing the scores of the engine with a full evaluation.
+    """
+    def __init__(self, incidence):
+        self.incidence = incidence
+        self.max_difference = 0.0
+        self.mismatches = 0
+        self.tied_mismatches = 0
+
+    def __call__(self, engine):
+        full = self.incidence.population_average_travel_times(engine.population)
+        differences = np.abs(engine.scores - full)
+        self.max_difference = max(self.max_difference, float(differences.max()))
+        self.mismatches += int(np.count_nonzero(differences))
+        _, first, inverse = np.unique(engine.population, axis=0, return_index=True,
+                                      return_inverse=True)
+        self.tied_mismatches += int(np.count_nonzero(
+            engine.scores != engine.scores[first][inverse.ravel()]))
+        return False
+
+
+def run(experiment, args, delta, callback=None):
+    incidence = experiment.incidence
+    np.random.seed(args.seed)
+    engine = ArrayGA(incidence.driver_num_routes, args.population, args.generations, 0.2,
+                     args.mutation, 2, None, callback,
+                     batch_evaluator=incidence.population_average_travel_times,
+                     flows=PopulationFlows(incidence) if delta else None,
+                     stop_on_convergence=False)
+    start = time.time()
+    best = engine.evolve()
+    return best.score, time.time() - start
+
+
+def main():
+    prs = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                  description="GA delta evaluation regression check.")
+    prs.add_argument("-f", dest="file", required=True, help="The network file.\n")
+    prs.add_argument("-k", type=int, default=4, help="Number of routes of each OD pair.\n")
+    prs.add_argument("-g", "--generations", type=int, default=300, help="Generations.\n")
+    prs.add_argument("-p", "--population", type=int, default=30, help="Population size.\n")
+    prs.add_argument("-m", "--mutation", type=float, default=0.01, help="Mutation rate.\n")
+    prs.add_argument("-s", "--seed", type=int, default=0, help="Random seed.\n")
+    args = prs.parse_args()
+
+    experiment = Experiment(args.k, args.file, 1)
+    check = Check(experiment.incidence)
+    best, _ = run(experiment, args, True, check)
+    _, delta_time = run(experiment, args, True)
+    full_best, full_time = run(experiment, args, False)
+
+    print("Drivers: {0}\tRoutes: {1}\tGenerations: {2}".format(
+        experiment.incidence.num_drivers, experiment.incidence.num_routes, args.generations))
+    print("Delta evaluation: {0:8.3f}s  best {1!r}".format(delta_time, best))
+    print("Full evaluation:  {0:8.3f}s  best {1!r}".format(full_time, full_best))
+    print("Scores differing from a full evaluation: {0} (largest difference {1!r})".format(
+        check.mismatches, check.max_difference))
+    print("Equal genomes with different scores: {0}".format(check.tied_mismatches))
+    if check.mismatches or check.tied_mismatches or best != full_best:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
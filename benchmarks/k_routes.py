@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+Benchmark of the k shortest routes: getKRoutes for each OD pair against the routes of all the OD
+pairs of an origin computed at once (shortest_paths.Graph). It also compares the route sets: the
+OD pairs with the same routes, and those whose routes only differ among routes of the same cost.
+
+Usage:
+    python benchmarks/k_routes.py -f NETWORK_FILE [-k K] [-n FLOW]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import modules.functions.functions as utils
+import modules.experiment.classes as classes
+from modules.experiment.routes import k_routes
+
+
+def compare(per_pair, batched):
+    """
+    Number of OD pairs with the same routes, with routes of the same costs, and the others.
+    """
+    same = ties = different = 0
+    for first, second in zip(per_pair, batched):
+        if [path[0] for path in first] == [path[0] for path in second]:
+            same += 1
+        elif sorted(round(path[1], 9) for path in first) \
+                == sorted(round(path[1], 9) for path in second):
+            ties += 1
+        else:
+            different += 1
+    return same, ties, different
+
+
+def main():
+    prs = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                  description="K shortest routes benchmark.")
+    prs.add_argument("-f", dest="file", required=True, help="The network file.\n")
+    prs.add_argument("-k", type=int, default=8, help="Number of routes of each OD pair.\n")
+    prs.add_argument("-n", "--flow", type=int, default=0, help="Base flow in the network.\n")
+    args = prs.parse_args()
+
+    vertices, edges, od_input = utils.read_infos(args.file, flow=args.flow)
+    od_list = [classes.OriginDestination(origin, destination, args.k, travels)
+               for origin, destination, travels in od_input]
+
+    start = time.time()
+    per_pair = k_routes(vertices, edges, od_list, method="ksp")
+    before = time.time() - start
+    start = time.time()
+    batched = k_routes(vertices, edges, od_list, method="batched")
+    after = time.time() - start
+
+    same, ties, different = compare(per_pair, batched)
+    print("Nodes: {0}\tEdges: {1}\tOD pairs: {2}\tOrigins: {3}\tk: {4}".format(
+        len(vertices), len(edges), len(od_list), len(set(od.origin for od in od_list)), args.k))
+    print("getKRoutes per OD pair: {0:8.3f}s".format(before))
+    print("Batched by origin:      {0:8.3f}s  ({1:.1f}x)".format(after, before / max(after, 1e-9)))
+    print("Same routes: {0}\tSame costs (ties): {1}\tDifferent: {2}".format(same, ties,
+                                                                            different))
+
+
+if __name__ == '__main__':
+    main()
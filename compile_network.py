@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module compiles a network file and its k shortest routes into a network bundle, which
+route_choice.py takes with -f instead of the network file.
+
+Usage:
+    python compile_network.py -f NETWORK_FILE -k K [-n FLOW] [-o BUNDLE]
+"""
+import argparse
+import time
+
+from modules.experiment.bundle import compile_network
+
+
+def build_parser():
+    """
+        Builds the parser and process the arguments.
+    """
+    prs = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                  description="Compiles a network file into a network bundle.")
+
+    prs.add_argument("-f", dest="file", required=True, help="The network file.\n")
+
+    prs.add_argument("-k", type=int, default=8,
+                     help="The 'K' hyperparameter for the KSP (K-ShortestPath) Algorithm.\n")
+
+    prs.add_argument("-n", "--flow", type=int, default=0, help="Base flow in the network.\n")
+
+    prs.add_argument("-o", "--output", type=str, default=None,
+                     help="Path of the bundle (default: next to the network file, named after k"
+                          + " and the flow).\n")
+
+    prs.add_argument("--ksp-workers", type=int, default=1,
+                     help="Number of processes computing the k shortest routes, one origin at a"
+                          + " time.\n")
+
+    prs.add_argument("--ksp-method", type=str, choices=["ksp", "batched"], default="ksp",
+                     help="How the k shortest routes are computed: getKRoutes for each OD pair"
+                          + " (the reference), or one shortest path tree shared by all the OD pairs"
+                          + " of an origin. \"batched\" picks other routes among those of the same"
+                          + " cost, so it gives other route sets (the drivers' actions) and other"
+                          + " results than \"ksp\"; it needs unique edge names.\n")
+
+    return prs.parse_args()
+
+
+if __name__ == "__main__":
+    args = build_parser()
+    start = time.time()
+    output = compile_network(args.file, args.k, args.flow, args.output, args.ksp_workers,
+                             args.ksp_method)
+    print("Network bundle: {0} ({1:.3f}s)".format(output, time.time() - start))
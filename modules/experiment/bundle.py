@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module compiles a network file and its k shortest routes into a network bundle, a single
+binary file the experiments start from without parsing the network nor computing the routes.
+
+The bundle is an uncompressed NumPy .npz with:
+    the nodes;
+    the edges: name, endpoints, cost at the base flow, cost formula, formula template (an index
+        into the templates) and constants (in compressed sparse rows);
+    the OD pairs and their demand;
+    the routes: the first route of each OD pair, the cost of each route and its edges, as the
+        route-edge incidence in compressed sparse rows (edge indexes into the bundle edges), and
+        the transposed incidence (the routes using each edge).
+The members of an uncompressed .npz are .npy files stored as they are, so the arrays are
+memory-mapped straight from the bundle: the processes of a run (and the runs at the same time)
+share the pages of the incidence instead of each one loading its own copy.
+"""
+import os
+import zipfile
+
+import numpy as np
+
+import ksp.KSP as KSP
+import modules.experiment.classes as classes
+import modules.functions.functions as utils
+from modules.experiment.incidence import transposed_incidence
+from modules.experiment.routes import network_hash, k_routes
+
+FORMAT_VERSION = 1
+
+
+def is_bundle(path):
+    """
+    Tells whether the file is a network bundle (a .npz) instead of a network file.
+    """
+    return os.path.splitext(path)[1] == ".npz" and zipfile.is_zipfile(path)
+
+
+def bundle_name(net_file, k, flow):
+    """
+    Default path of the bundle of a network file: next to it, named after k and the flow.
+    """
+    return "{0}_k{1}_f{2}.npz".format(os.path.splitext(net_file)[0], k, flow)
+
+
+def compile_network(net_file, k, flow=0, output=None, ksp_workers=1, ksp_method="ksp"):
+    """
+    Compiles a network file and its k shortest routes into a bundle.
+    In:
+        net_file:String = Path to the network file.
+        k:Integer = Number of routes of each OD pair.
+        flow:Float = Base flow of the network.
+        output:String = Path of the bundle (default: see bundle_name).
+        ksp_workers, ksp_method = How the routes are computed, see routes.k_routes.
+    Out:
+        output:String = Path of the bundle.
+    """
+    output = output or bundle_name(net_file, k, flow)
+    vertices, edges, od_input = utils.read_infos(net_file, flow=flow)
+    od_list = [classes.OriginDestination(origin, destination, k, travels)
+               for origin, destination, travels in od_input]
+    routes = k_routes(vertices, edges, od_list, ksp_workers, ksp_method)
+
+    templates = {}
+    edge_template = []
+    constant_names = []
+    constant_values = []
+    constant_indptr = [0]
+    for edge in edges:
+        formula, variables = edge.template
+        edge_template.append(templates.setdefault((formula, ",".join(variables)),
+                                                  len(templates)))
+        for name, value in edge.constants.items():
+            constant_names.append(name)
+            constant_values.append(value)
+        constant_indptr.append(len(constant_names))
+
+    #the engine keeps the last edge of a name, so do the routes
+    edge_index = dict((edge.name, i) for i, edge in enumerate(edges))
+    route_edges = []
+    route_indptr = [0]
+    route_costs = []
+    route_offsets = [0]
+    for paths in routes:
+        for path in paths:
+            route_edges.extend(edge_index[edge] for edge in path[0])
+            route_indptr.append(len(route_edges))
+            route_costs.append(path[1])
+        route_offsets.append(len(route_costs))
+    route_edges = np.array(route_edges, dtype=np.intp)
+    route_indptr = np.array(route_indptr, dtype=np.intp)
+    edge_routes, edge_indptr = transposed_incidence(route_edges, np.diff(route_indptr),
+                                                    len(edges))
+
+    temporary = "{0}.{1}.tmp.npz".format(output[:-len(".npz")], os.getpid())
+    np.savez(temporary,
+             format_version=np.array(FORMAT_VERSION),
+             k=np.array(k),
+             flow=np.array(flow, dtype=float),
+             network_hash=np.array(network_hash(net_file)),
+             node_names=np.array([node.name for node in vertices], dtype=str),
+             edge_names=np.array([edge.name for edge in edges], dtype=str),
+             edge_starts=np.array([edge.start for edge in edges], dtype=str),
+             edge_ends=np.array([edge.end for edge in edges], dtype=str),
+             edge_costs=np.array([edge.cost for edge in edges], dtype=float),
+             edge_functions=np.array([edge.function for edge in edges], dtype=str),
+             edge_template=np.array(edge_template, dtype=np.intp),
+             template_formulas=np.array([formula for formula, _ in templates], dtype=str),
+             template_variables=np.array([variables for _, variables in templates], dtype=str),
+             constant_indptr=np.array(constant_indptr, dtype=np.intp),
+             constant_names=np.array(constant_names, dtype=str),
+             constant_values=np.array(constant_values, dtype=float),
+             od_origins=np.array([od[0] for od in od_input], dtype=str),
+             od_destinations=np.array([od[1] for od in od_input], dtype=str),
+             od_demand=np.array([od[2] for od in od_input], dtype=float),
+             route_offsets=np.array(route_offsets, dtype=np.intp),
+             route_indptr=route_indptr,
+             route_edges=route_edges,
+             route_costs=np.array(route_costs, dtype=float),
+             edge_routes=edge_routes,
+             edge_indptr=edge_indptr)
+    os.replace(temporary, output)
+    return output
+
+
+def memory_map_npz(path):
+    """
+    Arrays of an uncompressed .npz, memory-mapped from the file (read-only).
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as bundle:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception("Error: the network bundle is compressed: " + path)
+            #the data of a member starts after its local header, name and extra field
+            bundle.seek(info.header_offset + 26)
+            lengths = np.frombuffer(bundle.read(4), dtype='<u2')
+            bundle.seek(info.header_offset + 30 + int(lengths[0]) + int(lengths[1]))
+            version = np.lib.format.read_magic(bundle)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(bundle)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(bundle)
+            name = info.filename[:-len(".npy")]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(bundle.name, dtype=dtype, mode='r',
+                                         offset=bundle.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+class BundlePaths(object):
+    """
+    Routes of an OD pair read from the bundle arrays when asked for, in the getKRoutes format
+    ([edge names, cost]).
+    """
+    def __init__(self, network, start, stop):
+        self.network = network
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("route index out of range")
+        route = self.start + index
+        arrays = self.network.arrays
+        entries = arrays["route_edges"][arrays["route_indptr"][route]:
+                                        arrays["route_indptr"][route + 1]]
+        return [[self.network.edge_names[edge] for edge in entries.tolist()],
+                float(arrays["route_costs"][route])]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class NetworkBundle(object):
+    """
+    A compiled network, its arrays memory-mapped from the bundle file.
+    In:
+        path:String = Path to the bundle.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.arrays = memory_map_npz(path)
+        if int(self.arrays["format_version"]) != FORMAT_VERSION:
+            raise Exception("Error: unsupported network bundle version, compile it again: "
+                            + path)
+        self.k = int(self.arrays["k"])
+        self.flow = float(self.arrays["flow"])
+        self.edge_names = self.arrays["edge_names"].tolist()
+
+    def check(self, k, flow):
+        """
+        Raises an exception when the bundle wasn't compiled with the given k and base flow.
+        """
+        if k != self.k or float(flow) != self.flow:
+            raise Exception("Error: the network bundle {0} has the routes for k={1} and flow={2},"
+                            " not k={3} and flow={4}.".format(self.path, self.k, self.flow, k,
+                                                              flow))
+
+    def read_infos(self):
+        """
+        Nodes, edges and OD pairs, as read_infos gives them for the network file.
+        """
+        arrays = self.arrays
+        vertices = [KSP.Node(name) for name in arrays["node_names"].tolist()]
+        templates = [(formula, variables.split(",")) for formula, variables
+                     in zip(arrays["template_formulas"].tolist(),
+                            arrays["template_variables"].tolist())]
+        names = arrays["constant_names"].tolist()
+        values = arrays["constant_values"].tolist()
+        indptr = arrays["constant_indptr"].tolist()
+        edges = [classes.EdgeRC(name, start, end, cost, function, templates[template],
+                                dict(zip(names[indptr[i]:indptr[i + 1]],
+                                         values[indptr[i]:indptr[i + 1]])))
+                 for i, (name, start, end, cost, function, template) in enumerate(zip(
+                     self.edge_names, arrays["edge_starts"].tolist(),
+                     arrays["edge_ends"].tolist(), arrays["edge_costs"].tolist(),
+                     arrays["edge_functions"].tolist(), arrays["edge_template"].tolist()))]
+        od_input = list(zip(arrays["od_origins"].tolist(), arrays["od_destinations"].tolist(),
+                            arrays["od_demand"].tolist()))
+        return vertices, edges, od_input
+
+    def routes(self):
+        """
+        Routes of each OD pair (read from the bundle when asked for).
+        """
+        offsets = self.arrays["route_offsets"].tolist()
+        return [BundlePaths(self, offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1)]
+
+    def incidence(self, cost_engine):
+        """
+        The routes as arrays for RouteIncidence, in the edge order of the engine. They are the
+        memory-mapped arrays when the engine keeps the order of the bundle edges.
+        """
+        arrays = self.arrays
+        order = np.array([cost_engine.index[name] for name in self.edge_names], dtype=np.intp)
+        if order.size == cost_engine.num_edges and np.array_equal(order, np.arange(order.size)):
+            return (arrays["route_offsets"], arrays["route_indptr"], arrays["route_edges"],
+                    arrays["edge_routes"], arrays["edge_indptr"])
+        route_edges = order[arrays["route_edges"]]
+        return (arrays["route_offsets"], arrays["route_indptr"], route_edges)
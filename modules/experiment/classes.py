@@ -1,14 +1,60 @@
 """
 Changelog:
     v1.0 - Created. <08/03/2017>
+    v1.1 - Cost formulas are compiled once and shared between edges. <18/10/2026>
+    v1.2 - Drivers kept as OD pair indexes by DriverPopulation. <18/10/2026>
+    v1.3 - DriverPopulation accepts slices. <18/10/2026>
 
 Author: Arthur Zachow Coelho (arthur.zachow@gmail.com)
 Created: 08/03/2017
 
 This module has the classes used in the simulation.
 """
+import numpy as np
 from py_expression_eval import Parser
 from ksp.KSP import Edge
+from modules.functions.expressions import compile_expression
+
+
+class CostFunction(object):
+    """
+    Represents a cost formula of the network, parsed and compiled only once.
+    Edges with the same formula share the same instance, use CostFunction.get to obtain it.
+    In:
+        function:String = The cost formula, with 'f' as the flow variable.
+    """
+    _cache = {}
+
+    def __init__(self, function):
+        self.function = function
+        self.expression = Parser().parse(function)
+        try:
+            self._evaluate = compile_expression(self.expression, ['f'])
+        except ValueError:
+            #Formulas out of the supported subset are evaluated by the parsed expression
+            self._evaluate = lambda var_value: self.expression.evaluate({'f': var_value})
+
+    def __repr__(self):
+        return repr(self.function)
+
+    def __call__(self, var_value):
+        return self._evaluate(var_value)
+
+    @classmethod
+    def get(cls, function):
+        """
+        Returns the compiled cost function of a formula, compiling it on the first request.
+        In:
+            function:String = The cost formula.
+
+        Out:
+            cost_function:CostFunction = Shared compiled formula.
+        """
+        cost_function = cls._cache.get(function)
+        if cost_function is None:
+            cost_function = cls(function)
+            cls._cache[function] = cost_function
+        return cost_function
 
 
 class EdgeRC(Edge):
@@ -17,10 +63,16 @@ class EdgeRC(Edge):
     Inherits from the Edge class from the KSP code.
     In:
         function:String = The cost function.
+        template:Tuple = Formula of the network file the cost function came from and its
+                         arguments, i.e. (formula, [arguments]).
+        constants:Dictionary = Values of the template constants for this edge.
     """
-    def __init__(self, name, start, end, cost, function):
+    def __init__(self, name, start, end, cost, function, template=None, constants=None):
         Edge.__init__(self, name, start, end, cost)
         self.function = function
+        self.template = template
+        self.constants = constants
+        self.cost_function = CostFunction.get(function)
 
     def __repr__(self):
         return repr(self.name)
@@ -34,9 +86,7 @@ class EdgeRC(Edge):
         Out:
             value:Float = result of the calculation.
         """
-        parser = Parser()
-        expression = parser.parse(self.function)
-        return expression.evaluate({'f': var_value})
+        return self.cost_function(var_value)
 
 
 class Driver(object):
@@ -61,6 +111,94 @@ class Driver(object):
                     str(self.origin_destination.destination))
 
 
+class DriverPopulation(object):
+    """
+    Represents all the drivers of the network without one object per trip.
+
+    The drivers of an OD pair are contiguous and follow the order of the OD list, so a driver is
+    identified by its position and its OD pair is found through the offsets of each OD pair.
+    Indexing or iterating returns a Driver, kept as a lightweight view shared by the drivers of
+    the same OD pair; a slice returns a list of them, as for a list of drivers.
+
+    Input:
+    od_list: list of OriginDestination
+    counts: number of drivers of each OD pair
+    """
+
+    def __init__(self, od_list, counts):
+        """
+        Class constructor.
+        """
+        self.od_list = od_list
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.zeros(len(od_list) + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.offsets[1:])
+        self.views = [Driver(od_pair) for od_pair in od_list]
+        self._od_index = None
+
+    @property
+    def od_index(self):
+        """
+        OD pair index of each driver, built on first use.
+        """
+        if self._od_index is None:
+            self._od_index = np.repeat(np.arange(len(self.od_list), dtype=np.int32), self.counts)
+        return self._od_index
+
+    def od_of(self, index):
+        """
+        OD pair index of the driver at the given position.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("driver index out of range")
+        return int(np.searchsorted(self.offsets, index, side='right')) - 1
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            #a list of the drivers, as the slice of a list
+            positions = np.arange(*index.indices(len(self)))
+            ods = np.searchsorted(self.offsets, positions, side='right') - 1
+            return [self.views[od] for od in ods.tolist()]
+        return self.views[self.od_of(index)]
+
+    def __iter__(self):
+        for view, count in zip(self.views, self.counts):
+            for _ in range(count):
+                yield view
+
+    def __repr__(self):
+        return "DriverPopulation(%d drivers, %d OD pairs)" % (len(self), len(self.od_list))
+
+
+def od_indexes(drivers, od_list=None):
+    """
+    OD pair index of each driver.
+    In:
+        drivers:List = DriverPopulation or list of Driver.
+        od_list:List = OD pairs the indexes refer to (default: the ones of the drivers, in the
+                       order they first appear).
+    Out:
+        od_index:Array = OD pair index of each driver.
+        od_list:List = The OD pairs.
+    """
+    if isinstance(drivers, DriverPopulation) and (od_list is None or od_list is drivers.od_list):
+        return drivers.od_index, drivers.od_list
+    if od_list is None:
+        first_seen = {}
+        for driver in drivers:
+            first_seen.setdefault(id(driver.origin_destination), driver.origin_destination)
+        od_list = list(first_seen.values())
+    od_position = dict((id(od_pair), i) for i, od_pair in enumerate(od_list))
+    od_index = np.array([od_position[id(driver.origin_destination)] for driver in drivers],
+                        dtype=np.intp)
+    return od_index, od_list
+
+
 class OriginDestination(object):
     """
     Represents an origin-destination pair, where:
@@ -89,4 +227,4 @@ class OriginDestination(object):
         """
         __str__ method override.
         """
-        return "%s%s".format(self.origin, self.destination)
+        return "{0}{1}".format(self.origin, self.destination)
@@ -0,0 +1,309 @@
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Templates checked against EdgeRC.eval_cost for each edge formula. <18/10/2026>
+
+This module evaluates the cost of every edge of the network at once.
+
+The edges are grouped by the formula of the network file they use (their template), and the
+constants of each group are kept in NumPy arrays, so a whole link-flow vector is evaluated with
+one vectorized call per template. Edges whose template can't be compiled are evaluated one by one
+through EdgeRC.eval_cost.
+
+EdgeRC.eval_cost evaluates the formula simplified with the constants of the edge, which
+py_expression_eval may parse back differently from the template (e.g. a negative constant,
+'(f/-3.0)^4'). The template of each edge formula is therefore checked against eval_cost at a few
+flows when the engine is built, and the edges where they disagree are evaluated by eval_cost.
+"""
+import numpy as np
+from py_expression_eval import Parser
+
+from modules.functions.expressions import compile_expression, VECTOR_NAMESPACE
+
+#Flows at which the templates are checked against the formulas of the edges
+CHECK_FLOWS = np.array([0.0, 1.0, 100.0])
+
+
+class TemplateGroup(object):
+    """
+    Edges sharing the same cost formula template.
+    In:
+        function:Function = Template compiled for NumPy arrays, flow first then the constants.
+        indexes:Array = Position of the edges of the group in the engine edge order.
+        constants:List = One array per template constant, aligned with indexes.
+    """
+    def __init__(self, function, indexes, constants):
+        self.function = function
+        self.indexes = indexes
+        self.constants = constants
+
+    def evaluate(self, flows):
+        """
+        Costs of the edges of the group, flows has the group edges on its last axis.
+        """
+        return self.function(flows, *self.constants)
+
+
+class CostEngine(object):
+    """
+    Evaluates the costs of all the edges of the network for a link-flow vector.
+    In:
+        edges:EdgeRC = List of edges of the network.
+
+    The engine order of the edges is the one of edge_names; when two edges have the same name
+    the last one is kept, as in the dictionaries indexed by edge name.
+    """
+    def __init__(self, edges):
+        by_name = {}
+        for edge in edges:
+            by_name[edge.name] = edge
+        self.edge_names = list(by_name.keys())
+        self.edges = [by_name[name] for name in self.edge_names]
+        self.index = dict((name, i) for i, name in enumerate(self.edge_names))
+        self.num_edges = len(self.edges)
+
+        templates = {}
+        members = {}
+        fallback = []
+        checked = {}
+        for i, edge in enumerate(self.edges):
+            key = self._template_key(edge)
+            if key is not None and key not in templates:
+                templates[key] = self._compile_template(key)
+            if key is None or templates[key] is None:
+                fallback.append(i)
+                continue
+            #edges with the same formula have the same constants: checked once
+            agrees = checked.get(edge.function)
+            if agrees is None:
+                agrees = checked[edge.function] = self._agrees(templates[key], key, edge)
+            if agrees:
+                members.setdefault(key, []).append(i)
+            else:
+                fallback.append(i)
+
+        self.groups = []
+        #Group of each edge (-1 for the fallback ones) and its position inside the group
+        self.group_of = np.full(self.num_edges, -1, dtype=np.intp)
+        self.position = np.zeros(self.num_edges, dtype=np.intp)
+        for key, indexes in members.items():
+            constants = [np.array([self.edges[i].constants[name] for i in indexes], dtype=float)
+                         for name in key[2]]
+            self.group_of[indexes] = len(self.groups)
+            self.position[indexes] = np.arange(len(indexes))
+            self.groups.append(TemplateGroup(templates[key], np.array(indexes, dtype=np.intp),
+                                             constants))
+        self.fallback = np.array(fallback, dtype=np.intp)
+
+    @staticmethod
+    def _template_key(edge):
+        """
+        Key identifying the template of an edge, None when the edge has no usable template.
+        """
+        if edge.template is None or edge.constants is None:
+            return None
+        formula, arguments = edge.template
+        if len(arguments) != 1:
+            return None
+        return (formula, arguments[0], tuple(sorted(edge.constants.keys())))
+
+    @staticmethod
+    def _compile_template(key):
+        """
+        Compiles a template for NumPy arrays, or returns None when it can't be vectorized.
+        """
+        formula, argument, constant_names = key
+        try:
+            expression = Parser().parse(formula)
+        except Exception:
+            return None
+        variables = [argument] + list(constant_names)
+        if [v for v in expression.variables() if v not in variables and v not in VECTOR_NAMESPACE]:
+            return None
+        try:
+            return compile_expression(expression, variables, VECTOR_NAMESPACE)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _agrees(function, key, edge):
+        """
+        Whether the compiled template gives the costs of eval_cost for the edge.
+        """
+        try:
+            with np.errstate(all='ignore'):
+                expected = np.array([edge.eval_cost(flow) for flow in CHECK_FLOWS])
+                values = np.broadcast_to(function(CHECK_FLOWS, *[edge.constants[name]
+                                                                 for name in key[2]]),
+                                         CHECK_FLOWS.shape)
+            return bool(np.allclose(values, expected, rtol=1e-9, atol=0.0, equal_nan=True))
+        except Exception:
+            return False
+
+    def evaluate(self, flows, indexes=None):
+        """
+        Costs of the edges for the given flows.
+        In:
+            flows:Array = Link flows in the engine edge order, on the last axis (a single
+                          vector or one vector per row).
+            indexes:Array = Engine index of the edge of each position of the last axis of flows,
+                            when only some edges (possibly repeated) are evaluated.
+        Out:
+            costs:Array = Cost of each edge, same shape as flows.
+        """
+        flows = np.asarray(flows, dtype=float)
+        costs = np.empty_like(flows)
+        if indexes is None:
+            for group in self.groups:
+                costs[..., group.indexes] = group.evaluate(flows[..., group.indexes])
+            fallback = zip(self.fallback, self.fallback)
+        else:
+            indexes = np.asarray(indexes, dtype=np.intp)
+            groups = self.group_of[indexes]
+            for number in np.unique(groups[groups >= 0]):
+                group = self.groups[number]
+                selected = np.flatnonzero(groups == number)
+                positions = self.position[indexes[selected]]
+                costs[..., selected] = group.function(flows[..., selected],
+                                                      *[c[positions] for c in group.constants])
+            selected = np.flatnonzero(groups < 0)
+            fallback = zip(selected, indexes[selected])
+
+        for column, i in fallback:
+            edge = self.edges[i]
+            if flows.ndim == 1:
+                costs[column] = edge.eval_cost(flows[column])
+            else:
+                costs[..., column] = np.reshape([edge.eval_cost(flow)
+                                                 for flow in flows[..., column].ravel()],
+                                                flows.shape[:-1])
+        return costs
+
+    def flow_vector(self, link_occupancy):
+        """
+        Link-flow vector, in the engine edge order, of a dictionary of flows by edge name.
+        """
+        return np.array([link_occupancy[name] for name in self.edge_names], dtype=float)
+
+    def evaluate_links(self, link_occupancy):
+        """
+        Costs by edge name for a dictionary of flows by edge name.
+        In:
+            link_occupancy:Dictionary = Flow of each edge.
+        Out:
+            edges_travel_times:Dictionary = Cost of each edge.
+        """
+        costs = self.evaluate(self.flow_vector(link_occupancy))
+        return dict(zip(self.edge_names, costs.tolist()))
+
+
+def reachable_flows(engine, od_list, group_size):
+    """
+    Highest flow each edge can get: the demand of every OD pair with a route through it.
+    In:
+        engine:CostEngine = Engine defining the edge order.
+        od_list:OriginDestination = List of OD pairs, with their paths already generated.
+        group_size:Integer = Number of drivers in a group.
+    Out:
+        max_flows:Array = Highest reachable flow of each edge, in the engine edge order.
+    """
+    max_flows = np.zeros(engine.num_edges, dtype=np.int64)
+    for od_pair in od_list:
+        used = set()
+        for path in od_pair.paths:
+            used.update(path[0])
+        indexes = [engine.index[edge] for edge in used]
+        max_flows[indexes] += int(round(od_pair.num_travels)) * group_size
+    return max_flows
+
+
+class CostTable(object):
+    """
+    Costs of each edge tabulated for every flow it can reach.
+
+    The link flows are always a multiple of the group size, so the cost of an edge is looked up
+    at the position flow / group_size of its table. Tables are kept while they fit in the memory
+    budget, smallest ranges first; edges with more than lazy_steps entries have their table
+    filled on demand instead of at startup, and edges left out of the budget are evaluated by
+    the engine.
+    In:
+        engine:CostEngine = Engine used to fill the tables.
+        group_size:Integer = Number of drivers in a group.
+        max_flows:Array = Highest reachable flow of each edge, in the engine edge order.
+        memory:Integer = Memory budget of the tables, in bytes.
+        lazy_steps:Integer = Largest table filled at startup.
+    """
+    def __init__(self, engine, group_size, max_flows, memory=256 * 2 ** 20, lazy_steps=100000):
+        self.engine = engine
+        self.group_size = group_size
+        self.edge_names = engine.edge_names
+        self.index = engine.index
+        self.num_edges = engine.num_edges
+
+        steps = np.asarray(max_flows, dtype=np.int64) // group_size + 1
+        budget = memory // np.dtype(float).itemsize
+        tabulated = []
+        for i in np.argsort(steps, kind='stable'):
+            if steps[i] > budget:
+                break
+            budget -= steps[i]
+            tabulated.append(i)
+        self.tabulated = np.sort(np.array(tabulated, dtype=np.intp))
+        self.direct = np.setdiff1d(np.arange(self.num_edges), self.tabulated)
+
+        self.steps = np.zeros(self.num_edges, dtype=np.int64)
+        self.steps[self.tabulated] = steps[self.tabulated]
+        self.offsets = np.zeros(self.num_edges, dtype=np.int64)
+        self.offsets[self.tabulated] = np.cumsum(self.steps[self.tabulated]) \
+            - self.steps[self.tabulated]
+        self.table = np.full(int(self.steps.sum()), np.nan)
+
+        #Fills at startup the tables which aren't too large
+        eager = self.tabulated[self.steps[self.tabulated] <= lazy_steps]
+        if eager.size:
+            indexes = np.repeat(eager, self.steps[eager])
+            entries = np.arange(indexes.size) - np.repeat(np.cumsum(self.steps[eager])
+                                                          - self.steps[eager], self.steps[eager])
+            self.table[np.repeat(self.offsets[eager], self.steps[eager]) + entries] = \
+                engine.evaluate(entries * float(group_size), indexes)
+
+    def evaluate(self, flows, indexes=None):
+        """
+        Costs of the edges for the given flows, see CostEngine.evaluate.
+        """
+        flows = np.asarray(flows, dtype=float)
+        if indexes is None:
+            indexes = np.arange(self.num_edges)
+        else:
+            indexes = np.asarray(indexes, dtype=np.intp)
+        flows, indexes = np.broadcast_arrays(flows, indexes)
+        entries = np.rint(flows / self.group_size).astype(np.int64)
+        found = (entries >= 0) & (entries < self.steps[indexes]) \
+            & (entries * self.group_size == flows)
+
+        costs = np.empty(flows.shape)
+        positions = self.offsets[indexes[found]] + entries[found]
+        values = self.table[positions]
+        missing = np.isnan(values)
+        if missing.any():
+            #Lazy fill of the entries never looked up before
+            values[missing] = self.engine.evaluate(flows[found][missing],
+                                                   indexes[found][missing])
+            self.table[positions[missing]] = values[missing]
+        costs[found] = values
+        if not found.all():
+            costs[~found] = self.engine.evaluate(flows[~found], indexes[~found])
+        return costs
+
+    def flow_vector(self, link_occupancy):
+        """
+        Link-flow vector, in the engine edge order, of a dictionary of flows by edge name.
+        """
+        return self.engine.flow_vector(link_occupancy)
+
+    def evaluate_links(self, link_occupancy):
+        """
+        Costs by edge name for a dictionary of flows by edge name.
+        """
+        costs = self.evaluate(self.flow_vector(link_occupancy))
+        return dict(zip(self.edge_names, costs.tolist()))
@@ -8,21 +8,74 @@ Warning: Use spaces instead of tabs, or configure your editor to transform tab t
 # Standard modules
 import os
 import string
+import time
+
+# Third-party modules
+import numpy as np
 
 # Local modules
 import modules.q_learning.q_learning as q_learning
 import modules.functions.functions as utils
 import modules.experiment.classes as classes
-import ksp.KSP as ksp
+import modules.experiment.costs as costs
+import modules.experiment.incidence as incidence
+import modules.experiment.routes as routes
+import modules.experiment.bundle as bundle
+from modules.genetic_algorithm.split_ga import RouteSplitGA, split_actions
+import modules.genetic_algorithm.seeding as seeding
 
 
 class Experiment(object):
     def __init__(self, k, net_file, group_size, table_fill_file=None,
                  flow=0, epsilon=1.0, TABLE_INITIAL_STATE='fixed',
-                 MINI=0.0, MAXI=0.0, fixed=0.0, action_selection="epsilon", temperature=0.0):
+                 MINI=0.0, MAXI=0.0, fixed=0.0, action_selection="epsilon", temperature=0.0,
+                 cost_table=False, cost_table_memory=256, reward_samples=0,
+                 reward_sample_interval=1, plot_rewards=False, qtable_file=None,
+                 qtable_load=False, qtable_dtype="float64", chunk_size=None,
+                 ga_engine="pyevolve", ga_delta=False,
+                 fitness_cache=1024, workers=1, islands=1, migration_interval=10,
+                 migration_size=2, migration_topology="ring", ga_encoding="driver",
+                 ga_seeding=0.0, concurrent_hybrid=False, route_cache=None, ksp_workers=1,
+                 ksp_method="ksp", verbose=False):
 
         '''
             Construct the experiment.
+
+            cost_table: tabulates the cost of each edge for every reachable flow.
+            cost_table_memory: memory budget of the cost tables, in MB.
+            reward_samples: how many QL rewards are kept to be plotted (0 keeps only aggregates).
+            reward_sample_interval: QL episodes between two reward samplings.
+            plot_rewards: plots the QL rewards after the run.
+            qtable_file: .npy file where the Q-table is memory-mapped (and kept after the run).
+            qtable_load: starts from the Q-table already in qtable_file.
+            qtable_dtype: float type of the Q-table values.
+            chunk_size: number of drivers processed at once by QL.
+            ga_engine: GA implementation, "pyevolve" or "native" (population as a NumPy matrix).
+            ga_delta: the native GA scores the children from the link flows of their parents,
+                      instead of the batch evaluator and the fitness cache (faster on large
+                      networks with a low mutation rate only).
+            fitness_cache: number of GA genomes whose score is cached (0 disables the cache).
+            workers: number of processes evaluating the GA population (native engine).
+            islands: number of GA populations evolved in parallel processes (island model).
+            migration_interval: generations between two migrations of the islands.
+            migration_size: individuals sent by each island at a migration.
+            migration_topology: islands receiving the migrants, "ring" or "random".
+            ga_encoding: GA genome, the route of each driver ("driver") or the number of drivers
+                         on each route of each OD pair ("split", native engine).
+            ga_seeding: fraction of the initial GA population seeded with the solutions of
+                        assignment heuristics on the free flow costs (native engine).
+            concurrent_hybrid: in the GA-QL hybrids, QL runs its episodes in its own process,
+                               at the same time as the GA.
+            route_cache: folder where the k shortest routes of the network are kept between
+                         runs (None computes them every time).
+            ksp_workers: number of processes computing the k shortest routes.
+            ksp_method: "ksp" (getKRoutes for each OD pair) or "batched" (one shortest path
+                        tree for all the OD pairs of an origin, which breaks the ties between
+                        routes of the same cost differently).
+            verbose: prints the time spent in each stage of the startup.
+
+            net_file may also be a network bundle (see bundle.compile_network) compiled with
+            the same k and flow: the network and its routes are read from it, memory-mapped.
         '''
 
         self.action_selection = action_selection
@@ -30,6 +83,25 @@ class Experiment(object):
         self.k = k
         self.epsilon = epsilon
         self.group_size = group_size
+        self.reward_samples = reward_samples
+        self.reward_sample_interval = reward_sample_interval
+        self.plot_rewards = plot_rewards
+        self.qtable_file = qtable_file
+        self.qtable_load = qtable_load
+        self.qtable_dtype = qtable_dtype
+        self.chunk_size = chunk_size
+        self.ga_engine = ga_engine
+        self.ga_delta = ga_delta
+        self.fitness_cache = fitness_cache
+        self.workers = workers
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.migration_topology = migration_topology
+        self.ga_encoding = ga_encoding
+        self.ga_seeding = ga_seeding
+        self.concurrent_hybrid = concurrent_hybrid
+        self.ql_process = None
 
         self.ODheader = ""
         self.ODL = []
@@ -42,30 +114,50 @@ class Experiment(object):
         self.fixed = fixed
         self.ODlist = []
 
-        self.Vo, self.Eo, odInputo = utils.read_infos(net_file, flow=flow)
+        #time spent in each stage of the startup
+        self.startup_times = []
+        start = time.time()
+
+        network = None
+        if bundle.is_bundle(net_file):
+            network = bundle.NetworkBundle(net_file)
+            network.check(k, flow)
+            self.Vo, self.Eo, odInputo = network.read_infos()
+        else:
+            self.Vo, self.Eo, odInputo = utils.read_infos(net_file, flow=flow)
+
+        header = []
 
         for tup_od in odInputo:
             if round(tup_od[2]) % self.group_size != 0:
-                print tup_od[2]
+                print(tup_od[2])
                 raise Exception("Error: number of travels is not a multiple \
                                  of the group size origin: " + str(tup_od[0])
                                 + " destination: " + str(tup_od[1]))
             else:
                 #Origin, destination, number of paths, number of travels
-                self.ODlist.append(classes.OD(tup_od[0], tup_od[1],
-                                      k, tup_od[2] / self.group_size))
+                self.ODlist.append(classes.OriginDestination(tup_od[0], tup_od[1],
+                                                             k, tup_od[2] / self.group_size))
                 self.ODL.append(str(tup_od[0]) + str(tup_od[1]))
                 for i in range(k):
-                    if len(self.ODheader) == 0:
-                        self.ODheader = self.ODheader + str(tup_od[0]) + "to" + str(tup_od[1]) \
-                                      + "_" + str(i + 1)
-                    else:
-                        self.ODheader = self.ODheader + " " + str(tup_od[0]) + "to" \
-                                      + str(tup_od[1]) + "_" + str(i + 1)
-
-        #Get the k shortest routes
-        for od_pair in self.ODlist:
-            od_pair.paths = ksp.getKRoutes(self.Vo, self.Eo, od_pair.o, od_pair.d, od_pair.numPaths)
+                    header.append(str(tup_od[0]) + "to" + str(tup_od[1]) + "_" + str(i + 1))
+        self.ODheader = " ".join(header)
+
+        self.startup_times.append(("parsing", time.time() - start))
+        start = time.time()
+
+        #Get the k shortest routes, from the bundle or the route cache when there is one
+        if network is not None:
+            od_routes = network.routes()
+        elif route_cache:
+            od_routes = routes.RouteCache(route_cache, net_file, k, flow, ksp_method).routes(
+                self.Vo, self.Eo, self.ODlist, ksp_workers)
+        else:
+            od_routes = routes.k_routes(self.Vo, self.Eo, self.ODlist, ksp_workers, ksp_method)
+        for od_pair, paths in zip(self.ODlist, od_routes):
+            od_pair.paths = paths
+        self.startup_times.append(("KSP", time.time() - start))
+        start = time.time()
 
         ##get the value of each link - free flow travel time
         self.freeFlow = {}
@@ -75,15 +167,74 @@ class Experiment(object):
         self.edgeNames = sorted(self.freeFlow.keys())
 
         #creates different drivers according to the number of travels of each OD
-        #instance
-        self.drivers = []
-        for od_pair in self.ODlist:
-            for i in range(int(round(od_pair.numTravels))):
-                self.drivers.append(classes.Driver(od_pair))
+        #instance; they are kept as OD pair indexes, not one object per trip
+        self.drivers = classes.DriverPopulation(self.ODlist, [int(round(od_pair.num_travels))
+                                                              for od_pair in self.ODlist])
+        self.startup_times.append(("drivers", time.time() - start))
+        start = time.time()
+
+        #evaluates the cost of all the edges at once, from tables of every reachable flow
+        #when asked for
+        self.cost_engine = costs.CostEngine(self.Eo)
+        if cost_table:
+            self.cost_engine = costs.CostTable(self.cost_engine, self.group_size,
+                                               costs.reachable_flows(self.cost_engine, self.ODlist,
+                                                                     self.group_size),
+                                               memory=int(cost_table_memory * 2 ** 20))
+
+        #route-edge incidence, computes the flows and travel times of each step
+        self.incidence = incidence.RouteIncidence(
+            self.ODlist, self.drivers, self.cost_engine, self.group_size,
+            network.incidence(self.cost_engine) if network is not None else None)
+        #flows of the previous QL episode, updated with the drivers that changed route
+        self.flows = incidence.IncrementalFlows(self.incidence)
+        self.startup_times.append(("structures", time.time() - start))
+        if verbose:
+            print("Startup: " + ", ".join("{0} {1:.3f}s".format(stage, seconds)
+                                          for stage, seconds in self.startup_times))
 
         if TABLE_INITIAL_STATE == 'coupling':
             self.TABLE_FILL = utils.generate_table_fill(table_fill_file)
 
+    def calculateIndividualTravelTime(self, actions):
+        """
+        Travel time of each driver for the routes it chose. Consecutive calls (the QL episodes)
+        only re-evaluate what the drivers that changed route touched.
+        In:
+            actions:List = Route chosen by each driver.
+        Out:
+            travel_times:Array = Travel time of each driver.
+        """
+        return self.flows.travel_times(actions)
+
+    def calculateAverageTravelTime(self, actions):
+        """
+        Average travel time of the drivers for the routes they chose.
+        """
+        return self.incidence.average_travel_time(actions)
+
+    def calculatePopulationAverageTravelTime(self, population):
+        """
+        Average travel time of each solution of a population, all evaluated at once.
+        In:
+            population:Array = Route chosen by each driver, one row per solution.
+        Out:
+            average_travel_times:Array = Average travel time of each solution.
+        """
+        return self.incidence.population_average_travel_times(population)
+
+    def calculateSplitAverageTravelTime(self, route_counts):
+        """
+        Average travel time of the drivers for a route-split genome (drivers on each route).
+        """
+        return float(self.incidence.population_counts_average_travel_times(route_counts)[0])
+
+    def calculatePopulationSplitAverageTravelTime(self, population):
+        """
+        Average travel time of each route-split genome of a population.
+        """
+        return self.incidence.population_counts_average_travel_times(population)
+
     def genCallBack(self, ga_engine):
         """
         GA stuff. Not ready for it yet, assuming it is working as it should.
@@ -106,17 +257,33 @@ class Experiment(object):
                 isGeneration = (generation + 1) % self.interval
 
             #check if we are running the GA<->QL or GA<-QL experiment.
-            if self.useInterval and (isGeneration == 0) and (generation != 0):
+            exchange = self.useInterval and (isGeneration == 0) and (generation != 0)
+            if self.ql_process is not None:
+                #concurrent QL: sends the GA solution to its next episode, or takes the
+                #solution of an episode ended since the last generation
+                if exchange:
+                    qlind = self.__actions(ga_engine, ga_engine.bestIndividual().getInternalList())
+                    self.ql_process.send(qlind)
+                else:
+                    latest = self.ql_process.latest()
+                    qlind = latest[1] if latest is not None else None
+            elif exchange:
                 (qlind, avg_tt) = \
-                    self.ql.runEpisodeWithAction(ga_engine.bestIndividual().getInternalList())
+                    self.ql.runEpisodeWithAction(self.__actions(ga_engine,
+                                                 ga_engine.bestIndividual().getInternalList()))
                     #GA->QL
             else:
                 (qlind, avg_tt) = self.ql.runEpisode()  # GA<-QL
                 #qlind is a array of paths taken by each driver
+        else:
+            qlind = None
 
-            #for each driver
-            for i in range(len(qlind)):
-                worstsol.getInternalList()[i] = qlind[i]
+        if qlind is not None:
+            #the route of each driver, or the drivers on each route with the split encoding
+            if hasattr(ga_engine, "from_actions"):
+                worstsol.setInternalList(ga_engine.from_actions(qlind))
+            else:
+                worstsol.getInternalList()[:] = qlind
             worstsol.evaluate()
 
             #if worstscore has a smaller average travel time than the
@@ -133,29 +300,103 @@ class Experiment(object):
                 worstsol.copy(ga_engine.getPopulation()[1])
                 ga_engine.getPopulation()[len(population) - 1].evaluate()
 
-        self.__print_step(generation, ga_engine.bestIndividual().getInternalList(),
+        self.__print_step(generation,
+                          self.__actions(ga_engine, ga_engine.bestIndividual().getInternalList()),
                           avgTT=ga_engine.bestIndividual().score, qlTT=worstsol.score)
 
+    def __actions(self, ga_engine, genome):
+        """
+        Route of each driver for a genome of the GA engine.
+        """
+        if hasattr(ga_engine, "to_actions"):
+            return ga_engine.to_actions(genome)
+        return genome
+
+    def seed_genomes(self, population):
+        """
+        Genomes seeding the initial GA population: all-or-nothing, incremental loading and MSA
+        solutions on the free flow costs, in the GA encoding.
+        Out:
+            seeds:Array = Distinct seed genomes (None when there is no seeding).
+            seed_rows:Integer = Number of individuals taken from them.
+        """
+        if self.ga_seeding <= 0:
+            return None, 0
+        free_flow = np.array([self.freeFlow[name] for name in self.cost_engine.edge_names])
+        seeds = seeding.heuristic_solutions(self.incidence, free_flow)
+        if self.ga_encoding != "split":
+            seeds = np.array([split_actions(self.incidence, genome) for genome in seeds])
+        return seeds, int(round(self.ga_seeding * population))
+
+    def islandCallBack(self, generation, genome, score):
+        """
+        Island model: receives the global best individual of each generation.
+        """
+        if self.ga_encoding == "split":
+            genome = split_actions(self.incidence, genome)
+        self.__print_step(generation, genome, avgTT=score)
+
+    def run_islands(self, generations, population, crossover, mutation, elite):
+        """
+        Runs the GA as an island model, each island with the native engine in its own process.
+        Out:
+            best:Tuple = Genome and average travel time of the best individual found.
+        """
+        from modules.genetic_algorithm.islands import IslandModel
+        from modules.genetic_algorithm.array_ga import ArrayGA
+        seeds, seed_rows = self.seed_genomes(population)
+        genes = self.incidence.driver_num_routes
+        engine_class = ArrayGA
+        evaluator = self.calculateAverageTravelTime
+        batch_evaluator = self.calculatePopulationAverageTravelTime
+        flows_factory = None
+        if self.ga_encoding == "split":
+            genes = self.incidence
+            engine_class = RouteSplitGA
+            evaluator = self.calculateSplitAverageTravelTime
+            batch_evaluator = self.calculatePopulationSplitAverageTravelTime
+        elif self.ga_delta:
+            flows_factory = lambda: incidence.PopulationFlows(self.incidence)
+        model = IslandModel(genes, self.islands, population, generations, crossover,
+                            mutation, elite, evaluator, interval=self.migration_interval,
+                            size=self.migration_size, topology=self.migration_topology,
+                            batch_evaluator=batch_evaluator, flows_factory=flows_factory,
+                            engine_class=engine_class, seeds=seeds, seed_rows=seed_rows)
+        return model.evolve(self.islandCallBack)
+
+    def create_ql(self):
+        """
+        Creates the QL learner with the parameters of the experiment.
+        """
+        return q_learning.QL(self, self.drivers, self.k, self.decay, self.alpha, self.TABLE_FILL,
+                             self.epsilon, self.TABLE_INITIAL_STATE, MINI=self.mini, MAX=self.maxi,
+                             fixed=self.fixed, action_selection=self.action_selection,
+                             temperature=self.temperature, reward_samples=self.reward_samples,
+                             reward_sample_interval=self.reward_sample_interval,
+                             qtable_file=self.qtable_file, qtable_load=self.qtable_load,
+                             qtable_dtype=self.qtable_dtype, chunk_size=self.chunk_size)
+
     def run_ql(self, num_episodes, alpha, decay):
         self.useGA = False
         self.useQL = True
         self.alpha = alpha
         self.decay = decay
-        self.ql = q_learning.QL(self, self.drivers, self.k, self.decay, self.alpha, self.TABLE_FILL,
-                     self.epsilon, self.TABLE_INITIAL_STATE, MINI=self.mini, MAX=self.maxi,
-                     fixed=self.fixed, action_selection=self.action_selection,
-                     temperature=self.temperature)
+        self.ql = self.create_ql()
 
         for episode in range(num_episodes):
             (instance, value) = self.ql.runEpisode()
             self.__print_step(episode, instance, qlTT=value)
+
+        self.ql.save_table()
+        if self.plot_rewards:
+            self.ql.plot_rewards()
         ''' To print progress bar, uncomment this line.
             print_progress(episode+1, num_episodes)
         '''
 
     def run_ga_ql(self, useQL, useInt, generations, population, crossover, mutation, elite, alpha,
                   decay, interval):
-        from modules.genetic_algorithm.genetic_algorithm import *
+        from modules.genetic_algorithm.genetic_algorithm import GA
         self.useGA = True
         self.useQL = useQL
         self.useInterval = useInt
@@ -167,25 +408,67 @@ class Experiment(object):
         self.elite = elite
         self.alpha = alpha
         self.decay = decay
+        if useQL and self.islands > 1:
+            raise Exception("Error: the island model runs the GA without QL.")
+        if self.workers > 1 and self.ga_engine != "native":
+            raise Exception("Error: the GA workers evaluate the population of the native engine"
+                            " (--ga-engine native).")
         if(useQL):
-            self.ql = q_learning.QL(self, self.drivers, self.k, self.decay, self.alpha, self.TABLE_FILL,
-                         self.epsilon, self.TABLE_INITIAL_STATE, MINI=self.mini, MAX=self.maxi,
-                         fixed=self.fixed, action_selection=self.action_selection,
-                         temperature=self.temperature)
+            self.ql = self.create_ql()
 
         filename, path, headerstr = self.createStringArguments(useQL, useInt)
+        #creates the file (and its folder) under a name no other run takes
         filename = utils.appendTag(filename)
 
-        ##creates file
-        if os.path.isdir(path) is False:
-            os.makedirs(path)
-
         self.outputFile = open(filename, 'w')
         self.outputFile.write(headerstr + '\n')
 
+        if self.islands > 1:
+            self.run_islands(generations, population, crossover, mutation, elite)
+            print("Output file location: %s" % filename)
+            self.outputFile.close()
+            return
+
+        #with several workers the whole population is evaluated in parallel, instead of the
+        #children from the flows of their parents
+        split = self.ga_encoding == "split"
+        evalFunc = self.calculateAverageTravelTime
+        evaluator = self.calculatePopulationAverageTravelTime
+        if split:
+            evalFunc = self.calculateSplitAverageTravelTime
+            evaluator = self.calculatePopulationSplitAverageTravelTime
+        seeds, seed_rows = self.seed_genomes(population)
+        flows = None
+        if self.workers > 1:
+            from modules.genetic_algorithm.parallel import ParallelEvaluator
+            evaluator = ParallelEvaluator(self.incidence, self.workers, counts=split)
+        elif self.ga_delta and not split:
+            flows = incidence.PopulationFlows(self.incidence)
+
         self.ga = GA(generations, population, crossover, mutation, elite, self,
-                     self.genCallBack, self.calculateAverageTravelTime, self.drivers)
-        self.ga.evolve()
+                     self.genCallBack, evalFunc, self.drivers,
+                     engine=self.ga_engine, batchEvalFunc=evaluator, populationFlows=flows,
+                     cacheSize=self.fitness_cache, encoding=self.ga_encoding,
+                     incidence=self.incidence, seeds=seeds, seedRows=seed_rows)
+        #QL episodes in their own process, at the same time as the GA generations
+        if useQL and self.concurrent_hybrid:
+            from modules.q_learning.concurrent import QLProcess
+            self.ql_process = QLProcess(self.ql)
+            self.ql_process.start()
+        try:
+            self.ga.evolve()
+        finally:
+            if self.workers > 1:
+                evaluator.close()
+            if self.ql_process is not None:
+                #the episodes end with the GA; the learner comes back from the process
+                self.ql_process.stop()
+                self.ql_process = None
+
+        if useQL:
+            self.ql.save_table()
+        if useQL and self.plot_rewards:
+            self.ql.plot_rewards()
 
         print("Output file location: %s" % filename)
         self.outputFile.close()
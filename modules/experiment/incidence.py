@@ -0,0 +1,544 @@
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Link flows and travel times of a whole population of solutions. <18/10/2026>
+    v1.2 - Solutions of a population evaluated from the differences to their base. <18/10/2026>
+    v1.3 - Travel times of solutions given as route counts. <18/10/2026>
+    v1.4 - Routes given as arrays, e.g. memory-mapped from a network bundle. <18/10/2026>
+    v1.5 - Totals of derived solutions recomputed instead of updated by differences. <18/10/2026>
+    v1.6 - Derived solutions compare only the drivers given as changed. <18/10/2026>
+
+This module has the incidence between the routes of the OD pairs and the edges of the network.
+
+Every KSP route of every OD pair gets a route index (the routes of an OD pair are contiguous) and
+the edges of each route are stored in compressed sparse rows. A step of the simulation is then a
+few array operations: the actions of the drivers are counted per route, the route counts are
+spread over the edges to get the link flows, and the route costs are gathered back to the drivers.
+"""
+import numpy as np
+
+from modules.experiment.classes import od_indexes
+
+
+def transposed_incidence(route_edges, route_lengths, num_edges):
+    """
+    Routes using each edge, in compressed sparse rows.
+    Out:
+        edge_routes:Array = Routes of the edges, those of each edge contiguous.
+        edge_indptr:Array = First entry of each edge.
+    """
+    entry_routes = np.repeat(np.arange(len(route_lengths)), route_lengths)
+    order = np.argsort(route_edges, kind='stable')
+    edge_indptr = np.zeros(num_edges + 1, dtype=np.intp)
+    np.cumsum(np.bincount(route_edges, minlength=num_edges), out=edge_indptr[1:])
+    return entry_routes[order], edge_indptr
+
+
+class RouteIncidence(object):
+    """
+    Sparse route-edge incidence of the network.
+    In:
+        od_list:OriginDestination = List of OD pairs, with their paths already generated.
+        drivers:DriverPopulation = The drivers (each one is a group of group_size trips).
+        cost_engine:CostEngine = Engine evaluating the edge costs, it defines the edge order.
+        group_size:Integer = Number of drivers in a group.
+        routes:Tuple = The routes as arrays (first route of each OD pair, first entry of each
+                       route and the edges of the routes, in the engine edge order, optionally
+                       followed by the transposed incidence); when given, the paths of the OD
+                       pairs aren't read.
+    """
+    def __init__(self, od_list, drivers, cost_engine, group_size, routes=None):
+        self.cost_engine = cost_engine
+        self.group_size = group_size
+        self.num_edges = cost_engine.num_edges
+        self.num_ods = len(od_list)
+
+        if routes is not None:
+            self.route_offsets, self.route_indptr, self.route_edges = routes[:3]
+            self.route_lengths = np.diff(self.route_indptr)
+        else:
+            #First route index of each OD pair
+            self.route_offsets = np.zeros(self.num_ods + 1, dtype=np.intp)
+            route_edges = []
+            route_lengths = []
+            for i, od_pair in enumerate(od_list):
+                for path in od_pair.paths:
+                    route_edges.extend(cost_engine.index[edge] for edge in path[0])
+                    route_lengths.append(len(path[0]))
+                self.route_offsets[i + 1] = self.route_offsets[i] + len(od_pair.paths)
+            self.route_lengths = np.array(route_lengths, dtype=np.intp)
+            self.route_indptr = np.zeros(len(self.route_lengths) + 1, dtype=np.intp)
+            np.cumsum(self.route_lengths, out=self.route_indptr[1:])
+            self.route_edges = np.array(route_edges, dtype=np.intp)
+        self.num_routes = int(self.route_offsets[-1])
+        self.route_od = np.repeat(np.arange(self.num_ods), np.diff(self.route_offsets))
+        self._route_starts = self.route_indptr[:-1][self.route_lengths > 0]
+
+        #Transposed incidence: the routes using each edge
+        if routes is not None and len(routes) > 3:
+            self.edge_routes, self.edge_indptr = routes[3:]
+        else:
+            self.edge_routes, self.edge_indptr = transposed_incidence(
+                self.route_edges, self.route_lengths, self.num_edges)
+
+        #OD pair of each driver, and the drivers grouped by OD pair
+        self.driver_od, _ = od_indexes(drivers, od_list)
+        self.num_drivers = len(self.driver_od)
+        self.driver_route_base = self.route_offsets[self.driver_od]
+        self.driver_num_routes = np.diff(self.route_offsets)[self.driver_od]
+        self.od_order = np.argsort(self.driver_od, kind='stable')
+        self.od_splits = np.cumsum(np.bincount(self.driver_od, minlength=self.num_ods))[:-1]
+
+    def route_ids(self, actions):
+        """
+        Route index of the action of each driver.
+        In:
+            actions:List = Route (0..k-1) chosen by each driver, or one row of them per solution.
+        Out:
+            route_ids:Array = Route index of each driver.
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        if np.any(actions >= self.driver_num_routes) or np.any(actions < 0):
+            raise IndexError("route index out of range for the OD pair of a driver")
+        return self.driver_route_base + actions
+
+    def route_counts(self, actions):
+        """
+        Number of drivers on each route.
+        """
+        return np.bincount(self.route_ids(actions), minlength=self.num_routes)
+
+    def link_flows(self, route_counts):
+        """
+        Flow of each edge, in the engine edge order, given the number of drivers on each route.
+        """
+        weights = np.repeat(np.asarray(route_counts, dtype=float), self.route_lengths)
+        return np.bincount(self.route_edges, weights=weights,
+                           minlength=self.num_edges) * self.group_size
+
+    def route_costs(self, edge_costs):
+        """
+        Cost of each route, i.e. the sum of the costs of its edges.
+        In:
+            edge_costs:Array = Cost of each edge, in the engine edge order, on the last axis.
+        Out:
+            route_costs:Array = Cost of each route, on the last axis.
+        """
+        edge_costs = np.asarray(edge_costs, dtype=float)
+        costs = np.zeros(edge_costs.shape[:-1] + (self.num_routes,))
+        if self._route_starts.size:
+            costs[..., self.route_lengths > 0] = np.add.reduceat(
+                edge_costs[..., self.route_edges], self._route_starts, axis=-1)
+        return costs
+
+    def evaluate(self, actions):
+        """
+        Simulates one step.
+        In:
+            actions:List = Route (0..k-1) chosen by each driver.
+        Out:
+            route_ids:Array = Route index of each driver.
+            link_flows:Array = Flow of each edge.
+            edge_costs:Array = Cost of each edge.
+            route_costs:Array = Cost of each route.
+        """
+        route_ids = self.route_ids(actions)
+        link_flows = self.link_flows(np.bincount(route_ids, minlength=self.num_routes))
+        edge_costs = self.cost_engine.evaluate(link_flows)
+        return route_ids, link_flows, edge_costs, self.route_costs(edge_costs)
+
+    def travel_times(self, actions):
+        """
+        Travel time of each driver.
+        """
+        route_ids, _, _, route_costs = self.evaluate(actions)
+        return route_costs[route_ids]
+
+    def average_travel_time(self, actions):
+        """
+        Average travel time of the drivers.
+        """
+        return float(np.sum(self.travel_times(actions))) / self.num_drivers
+
+    def population_link_flows(self, population):
+        """
+        Link flows of several solutions at once: the route counts of every solution are spread
+        over the edges with a single bincount, each solution offset by its row times the number
+        of edges.
+        In:
+            population:Array = Actions of every driver, one row per solution.
+        Out:
+            route_counts:Array = Number of drivers on each route, one row per solution.
+            link_flows:Array = Flow of each edge, one row per solution.
+        """
+        route_ids = self.route_ids(population)
+        rows = route_ids.shape[0]
+        offsets = np.arange(rows)[:, None]
+        route_counts = np.bincount((route_ids + offsets * self.num_routes).ravel(),
+                                   minlength=rows * self.num_routes).reshape(rows, self.num_routes)
+        return route_counts, self.population_counts_link_flows(route_counts)
+
+    def population_counts_link_flows(self, route_counts):
+        """
+        Link flows of several solutions given by the number of drivers on each route.
+        In:
+            route_counts:Array = Number of drivers on each route, one row per solution.
+        Out:
+            link_flows:Array = Flow of each edge, one row per solution.
+        """
+        rows = route_counts.shape[0]
+        offsets = np.arange(rows)[:, None]
+        weights = np.repeat(np.asarray(route_counts, dtype=float), self.route_lengths, axis=1)
+        link_flows = np.bincount((self.route_edges + offsets * self.num_edges).ravel(),
+                                 weights=weights.ravel(), minlength=rows * self.num_edges)
+        return link_flows.reshape(rows, self.num_edges) * self.group_size
+
+    def population_average_travel_times(self, population, max_entries=2 ** 24):
+        """
+        Average travel time of the drivers for each solution, evaluated in blocks of solutions
+        so the intermediate arrays stay under max_entries values.
+        In:
+            population:Array = Actions of every driver, one row per solution.
+            max_entries:Integer = Size bound of the arrays of a block.
+        Out:
+            average_travel_times:Array = Average travel time of each solution.
+        """
+        return self._population_averages(np.atleast_2d(np.asarray(population)),
+                                         self.population_link_flows, max_entries)
+
+    def population_counts_average_travel_times(self, route_counts, max_entries=2 ** 24):
+        """
+        Average travel time of the drivers for each solution given by the number of drivers on
+        each route (the route counts of every OD pair sum up to its number of drivers).
+        In:
+            route_counts:Array = Number of drivers on each route, one row per solution.
+            max_entries:Integer = Size bound of the arrays of a block.
+        Out:
+            average_travel_times:Array = Average travel time of each solution.
+        """
+        def link_flows(counts):
+            return counts, self.population_counts_link_flows(counts)
+        return self._population_averages(np.atleast_2d(np.asarray(route_counts)), link_flows,
+                                         max_entries)
+
+    def _population_averages(self, population, link_flows, max_entries):
+        """
+        Average travel times of a population, in blocks of rows; link_flows gives the route
+        counts and link flows of a block.
+        """
+        width = max(1, population.shape[1], self.route_edges.size, self.num_edges)
+        block = max(1, max_entries // width)
+        averages = np.zeros(population.shape[0])
+        for start in range(0, population.shape[0], block):
+            route_counts, flows = link_flows(population[start:start + block])
+            route_costs = self.route_costs(self.cost_engine.evaluate(flows))
+            averages[start:start + block] = _totals(route_counts, route_costs)
+        return averages / max(1, self.num_drivers)
+
+    def route_costs_of(self, routes, edge_costs):
+        """
+        Cost of some routes only.
+        In:
+            routes:Array = Route indexes.
+            edge_costs:Array = Cost of each edge.
+        Out:
+            route_costs:Array = Cost of each of the given routes.
+        """
+        lengths = self.route_lengths[routes]
+        entries = _gather_rows(self.route_indptr, routes, lengths)
+        costs = np.zeros(len(routes))
+        starts = np.cumsum(lengths) - lengths
+        nonempty = lengths > 0
+        if nonempty.any():
+            costs[nonempty] = np.add.reduceat(edge_costs[self.route_edges[entries]],
+                                              starts[nonempty])
+        return costs
+
+    def routes_using(self, edges):
+        """
+        Indexes of the routes using at least one of the given edges.
+        """
+        lengths = self.edge_indptr[np.asarray(edges) + 1] - self.edge_indptr[edges]
+        return np.unique(self.edge_routes[_gather_rows(self.edge_indptr, edges, lengths)])
+
+    def travel_times_by_od(self, travel_times):
+        """
+        Splits the travel times of the drivers by OD pair (in the order of the OD list).
+        """
+        return np.split(np.asarray(travel_times)[self.od_order], self.od_splits)
+
+
+def _moves(incidence, old_routes, new_routes):
+    """
+    Net change of drivers on the routes and of flow on the edges when some drivers move from
+    their old route to a new one.
+    Out:
+        routes:Array = Routes that lost or gained drivers.
+        delta:Array = Net change of drivers of each of those routes.
+        edges:Array = Edges whose flow changed.
+        edge_delta:Array = Net change of drivers (not flow) of each of those edges.
+    """
+    moved = np.concatenate((old_routes, new_routes))
+    routes, inverse = np.unique(moved, return_inverse=True)
+    delta = np.bincount(inverse, weights=np.repeat([-1.0, 1.0], len(old_routes)),
+                        minlength=routes.size)
+    routes = routes[delta != 0]
+    delta = delta[delta != 0]
+
+    lengths = incidence.route_lengths[routes]
+    edges = incidence.route_edges[_gather_rows(incidence.route_indptr, routes, lengths)]
+    edges, inverse = np.unique(edges, return_inverse=True)
+    edge_delta = np.bincount(inverse, weights=np.repeat(delta, lengths), minlength=edges.size)
+    return routes, delta, edges[edge_delta != 0], edge_delta[edge_delta != 0]
+
+
+def _apply_moves(incidence, routes, delta, edges, edge_delta, route_counts, link_flows,
+                 edge_costs, route_costs, affected=None):
+    """
+    Applies the changes found by _moves to the arrays of a step, in place: the route counts and
+    link flows, then the costs of the touched edges and of the routes using them (affected, when
+    already known).
+    Out:
+        affected:Array = Routes whose cost was re-evaluated.
+    """
+    route_counts[routes] += delta.astype(route_counts.dtype)
+    if edges.size == 0:
+        return edges
+    link_flows[edges] += edge_delta * incidence.group_size
+    edge_costs[edges] = incidence.cost_engine.evaluate(link_flows[edges], edges)
+    if affected is None:
+        affected = incidence.routes_using(edges)
+    route_costs[affected] = incidence.route_costs_of(affected, edge_costs)
+    return affected
+
+
+def _totals(route_counts, route_costs):
+    """
+    Total travel time of each solution (on the last axis). The full and the derived evaluations
+    both sum it this way, so equal solutions get exactly the same score.
+    """
+    return np.sum(route_counts * route_costs, axis=-1)
+
+
+def _gather_rows(indptr, rows, lengths):
+    """
+    Positions, in the compressed arrays, of the entries of the given rows (concatenated).
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    starts = np.repeat(indptr[rows] - (np.cumsum(lengths) - lengths), lengths)
+    return starts + np.arange(int(np.sum(lengths)))
+
+
+class IncrementalFlows(object):
+    """
+    Link flows and costs kept from one step to the next.
+
+    Only the drivers whose route changed since the previous step are applied to the link flows,
+    and only the edges they touched (and the routes using those edges) are re-evaluated. When
+    more than rebuild_fraction of the drivers changed, the step is computed from scratch. The
+    results are the same as RouteIncidence.evaluate, as the flows are sums of integers.
+    In:
+        incidence:RouteIncidence = Incidence of the network.
+        rebuild_fraction:Float = Fraction of changed drivers above which everything is rebuilt.
+    """
+    def __init__(self, incidence, rebuild_fraction=0.25):
+        self.incidence = incidence
+        self.rebuild_fraction = rebuild_fraction
+        self.route_ids = None
+        self.route_counts = None
+        self.link_flows = None
+        self.edge_costs = None
+        self.route_costs = None
+
+    def rebuild(self, route_ids):
+        """
+        Computes the step from scratch.
+        """
+        incidence = self.incidence
+        self.route_ids = route_ids
+        self.route_counts = np.bincount(route_ids, minlength=incidence.num_routes)
+        self.link_flows = incidence.link_flows(self.route_counts)
+        self.edge_costs = incidence.cost_engine.evaluate(self.link_flows)
+        self.route_costs = incidence.route_costs(self.edge_costs)
+
+    def update(self, actions):
+        """
+        Moves to the step of the given actions.
+        In:
+            actions:List = Route (0..k-1) chosen by each driver.
+        Out:
+            route_ids:Array = Route index of each driver.
+        """
+        incidence = self.incidence
+        route_ids = incidence.route_ids(actions)
+        if self.route_ids is None:
+            self.rebuild(route_ids)
+            return route_ids
+
+        changed = np.flatnonzero(route_ids != self.route_ids)
+        if changed.size > self.rebuild_fraction * incidence.num_drivers:
+            self.rebuild(route_ids)
+            return route_ids
+        if changed.size == 0:
+            return route_ids
+
+        routes, delta, edges, edge_delta = _moves(incidence, self.route_ids[changed],
+                                                  route_ids[changed])
+        self.route_ids = route_ids
+        _apply_moves(incidence, routes, delta, edges, edge_delta, self.route_counts,
+                     self.link_flows, self.edge_costs, self.route_costs)
+        return route_ids
+
+    def travel_times(self, actions):
+        """
+        Travel time of each driver, after moving to the step of the given actions.
+        """
+        route_ids = self.update(actions)
+        return self.route_costs[route_ids]
+
+
+class PopulationFlows(object):
+    """
+    Link flows, costs and total travel time of every solution of a population, kept so that a
+    solution derived from another one (a GA child from its parent) is evaluated from the
+    differences between them.
+
+    For each derived solution, only the drivers whose route differs from the base solution are
+    applied to a copy of its flows, and only the touched edges and the routes using them are
+    re-evaluated, as in IncrementalFlows. Solutions differing in more than rebuild_fraction of
+    the drivers are evaluated from scratch, all together. The total travel time of a derived
+    solution is then summed over its routes, as in a full evaluation, so it gets the same score.
+    In:
+        incidence:RouteIncidence = Incidence of the network.
+        rebuild_fraction:Float = Fraction of changed drivers above which a solution is rebuilt.
+    """
+    def __init__(self, incidence, rebuild_fraction=0.25):
+        self.incidence = incidence
+        self.rebuild_fraction = rebuild_fraction
+        self.genomes = None
+        self.route_counts = None
+        self.link_flows = None
+        self.edge_costs = None
+        self.route_costs = None
+        self.totals = None
+
+    def averages(self):
+        """
+        Average travel time of the drivers of each solution.
+        """
+        return self.totals / max(1, self.incidence.num_drivers)
+
+    def evaluate(self, population):
+        """
+        Evaluates a population from scratch.
+        In:
+            population:Array = Actions of every driver, one row per solution.
+        Out:
+            average_travel_times:Array = Average travel time of each solution.
+        """
+        incidence = self.incidence
+        self.genomes = np.array(population, copy=True)
+        self.route_counts, self.link_flows = incidence.population_link_flows(self.genomes)
+        self.edge_costs = incidence.cost_engine.evaluate(self.link_flows)
+        self.route_costs = incidence.route_costs(self.edge_costs)
+        self.totals = _totals(self.route_counts, self.route_costs)
+        return self.averages()
+
+    def derive(self, population, bases, changes=None):
+        """
+        Evaluates a population whose solutions derive from solutions of this one.
+        In:
+            population:Array = Actions of every driver, one row per solution.
+            bases:Array = Row, in this population, of the base of each new solution.
+            changes:List = Drivers whose action may differ from the base, for each solution
+                           (None compares all the drivers).
+        Out:
+            flows:PopulationFlows = The flows of the new population.
+        """
+        bases = np.asarray(bases, dtype=np.intp)
+        derived = PopulationFlows(self.incidence, self.rebuild_fraction)
+        derived.genomes = np.array(population, copy=True)
+        derived.route_counts = self.route_counts[bases]
+        derived.link_flows = self.link_flows[bases]
+        derived.edge_costs = self.edge_costs[bases]
+        derived.route_costs = self.route_costs[bases]
+        derived.totals = self.totals[bases]
+        derived.apply(self.genomes, np.arange(len(bases)), changes, bases)
+        return derived
+
+    def update(self, population, rows):
+        """
+        Re-evaluates the given rows after their actions changed.
+        Out:
+            average_travel_times:Array = Average travel time of the given rows.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        previous = self.genomes[rows]
+        self.genomes[rows] = population[rows]
+        self.apply(previous, rows)
+        return self.averages()[rows]
+
+    def apply(self, previous, rows, changes=None, previous_rows=None):
+        """
+        Moves the given rows from the previous actions to the ones in genomes.
+        In:
+            previous:Array = Previous actions, one row per given row.
+            changes:List = Drivers whose action may have changed, for each given row (None
+                           compares all the drivers).
+            previous_rows:Array = Row of previous of each given row, when it isn't in order.
+        """
+        incidence = self.incidence
+        if previous_rows is None:
+            previous_rows = np.arange(len(rows))
+        #only the drivers the operators touched are compared
+        moved = []
+        for i, row in enumerate(rows):
+            before = previous[previous_rows[i]]
+            if changes is None:
+                moved.append(np.flatnonzero(self.genomes[row] != before))
+            else:
+                drivers = changes[i]
+                moved.append(drivers[self.genomes[row, drivers] != before[drivers]])
+        counts = np.array([len(drivers) for drivers in moved], dtype=np.int64)
+        rebuild = counts > self.rebuild_fraction * incidence.num_drivers
+        if rebuild.any():
+            #Many changes: evaluated from scratch, all these rows at once
+            full = rows[rebuild]
+            route_counts, link_flows = incidence.population_link_flows(self.genomes[full])
+            self.route_counts[full] = route_counts
+            self.link_flows[full] = link_flows
+            self.edge_costs[full] = incidence.cost_engine.evaluate(link_flows)
+            self.route_costs[full] = incidence.route_costs(self.edge_costs[full])
+            self.totals[full] = _totals(route_counts, self.route_costs[full])
+
+        for i in np.flatnonzero(~rebuild & (counts > 0)):
+            row = rows[i]
+            drivers = moved[i]
+            base = incidence.driver_route_base[drivers]
+            routes, delta, edges, edge_delta = _moves(incidence,
+                                                      base + previous[previous_rows[i], drivers],
+                                                      base + self.genomes[row, drivers])
+            route_counts = self.route_counts[row]
+            route_costs = self.route_costs[row]
+            _apply_moves(incidence, routes, delta, edges, edge_delta, route_counts,
+                         self.link_flows[row], self.edge_costs[row], route_costs)
+            #the total is summed again (O(routes)): updating it by differences would drift
+            #from generation to generation, as the derived solutions pass it on
+            self.totals[row] = _totals(route_counts, route_costs)
+
+    def take(self, rows):
+        """
+        Keeps the given rows, in the given order (e.g. to sort the population).
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        for name in ("genomes", "route_counts", "link_flows", "edge_costs", "route_costs",
+                     "totals"):
+            setattr(self, name, getattr(self, name)[rows])
+
+    def copy_row(self, source, source_row, row):
+        """
+        Copies a row of another PopulationFlows (or of this one) to a row of this one.
+        """
+        for name in ("genomes", "route_counts", "link_flows", "edge_costs", "route_costs",
+                     "totals"):
+            getattr(self, name)[row] = getattr(source, name)[source_row]
@@ -1,6 +1,7 @@
 import os
-from time import localtime
 import modules.functions.functions as utils
+from modules.experiment.costs import CostEngine
+from modules.experiment.incidence import RouteIncidence
 
 
 class Output():
@@ -17,6 +18,12 @@ class Output():
         self.print_drivers_route = print_drivers_route
         # Empty filename
         self.filename = ""
+        # Evaluates the costs of all the edges at once (the experiment one may use cost tables)
+        self.cost_engine = infos.get("cost_engine") or CostEngine(infos["Eo"])
+        # Route-edge incidence used to compute flows and travel times
+        self.incidence = infos.get("incidence") or RouteIncidence(infos["ODlist"], infos["drivers"],
+                                                                  self.cost_engine,
+                                                                  infos["group_size"])
 
     def build_od_pair_data(self, travel_times_od):
         """
@@ -36,21 +43,8 @@ class Output():
         """
             Test if there isn't already a file with the desired name, sometimes
             the repetitions of the experiments are less than 1s apart.
-
-        In:
-            fn_wo_tag:String = Filename without the tag.
-        Out:
-            filenamewithtag:String = Filename with the tag.
         """
-        time = localtime()
-        self.filename += str(time[3]) + 'h' + str(time[4]) + 'm' + str(time[5]) + 's'
-        append_number = ''
-        while os.path.isfile(self.filename + append_number + ".txt"):
-            if append_number == '':
-                append_number = "-1"
-            else:
-                append_number = "-" + str(int(append_number[1:]) + 1)
-        self.filename = self.filename + append_number + ".txt"
+        self.filename = utils.appendTag(self.filename)
 
     def nodes_string(self):
         """
@@ -82,59 +76,31 @@ class Output():
         return len(self.infos["drivers"]) * self.infos["group_size"]
 
     def travel_time_od(self, string_actions):
-        edges_travel_times = self.calculate_edges_travel_times(string_actions)
+        travel_times = self.incidence.travel_times(string_actions)
         od_travel_time_dict = {}
 
         for od_pair in self.infos["ODlist"]:
             od_travel_time_dict[str(od_pair)] = []
 
-        for index, action in enumerate(string_actions):
-            path = self.infos["drivers"][index].origin_destination.paths[action][0]
-            traveltime = 0.0
-            for edge in path:
-                traveltime += edges_travel_times[edge]
-            od_travel_time_dict[str(self.infos["drivers"][index].origin_destination)].append(traveltime)
+        for od_pair, od_travel_times in zip(self.infos["ODlist"],
+                                            self.incidence.travel_times_by_od(travel_times)):
+            od_travel_time_dict[str(od_pair)].extend(od_travel_times.tolist())
 
         return od_travel_time_dict
 
     def calculate_edges_travel_times(self, string_actions):
-        edges_travel_times = {}
-        # Get the flow of that edge
-        link_occupancy = self.drivers_per_link(string_actions)
-        # For each edge
-        for edge in self.infos["Eo"]:
-            # Evaluates the cost of that edge with a given flow (i.e. edge.eval_cost(flow))
-            edges_travel_times[edge.name] = edge.eval_cost(link_occupancy[edge.name])
-        return edges_travel_times
+        # Evaluates the cost of every edge with its flow in one call
+        _, _, edge_costs, _ = self.incidence.evaluate(string_actions)
+        return dict(zip(self.cost_engine.edge_names, edge_costs.tolist()))
 
     def calculate_average_travel_time(self, string_actions):
-        # Calculates the individual travel times
-        edges_travel_times = self.calculate_edges_travel_times(string_actions)
-        results = []
-        for driver_index, action in enumerate(string_actions):
-            # Calculates travel times for a driver
-            travel_times = 0.0
-            path = self.infos["drivers"][driver_index].origin_destination.paths[action][0]
-            for edge in path:
-                travel_times += edges_travel_times[edge]
-            results.append(travel_times)
-
-        return sum(results) / len(string_actions)
+        # Sum of the travel times of the drivers, taken from the cost of their routes
+        return self.incidence.average_travel_time(string_actions)
 
     def drivers_per_link(self, driver_string):
-        dicti = {}
-        for index, driver in enumerate(driver_string):
-            path = self.infos["drivers"][index].origin_destination.paths[driver]
-            for edge in path[0]:
-                if edge in dicti.keys():
-                    dicti[edge] += self.infos["group_size"]
-                else:
-                    dicti[edge] = self.infos["group_size"]
-
-        for link in self.infos["freeFlow"].keys():
-            if link not in dicti.keys():
-                dicti[link] = 0
-        return dicti
+        # Spreads the number of drivers on each route over its edges
+        link_flows = self.incidence.link_flows(self.incidence.route_counts(driver_string))
+        return dict(zip(self.cost_engine.edge_names, link_flows.astype(int).tolist()))
 
 
 class QlOutput(Output):
@@ -147,8 +113,7 @@ class QlOutput(Output):
         self._create_filename()
         super().append_tag()
         # Creates folder to create the file
-        if os.path.isdir(self.path) is False:
-            os.makedirs(self.path)
+        os.makedirs(self.path, exist_ok=True)
 
         self.output_file = open(self.filename, 'w')
         print(self._create_header(), file=self.output_file)
@@ -240,8 +205,7 @@ class GaOutput(Output):
         self._create_filename()
         super().append_tag()
         # Creates folder to create the file
-        if os.path.isdir(self.path) is False:
-            os.makedirs(self.path)
+        os.makedirs(self.path, exist_ok=True)
 
         self.output_file = open(self.filename, 'w')
         print(self._create_header(), file=self.output_file)
@@ -317,8 +281,7 @@ class QlGaOutput(GaOutput):
         self._create_filename()
         super().append_tag()
         # Creates folder to create the file
-        if os.path.isdir(self.path) is False:
-            os.makedirs(self.path)
+        os.makedirs(self.path, exist_ok=True)
 
         self.output_file = open(self.filename, 'w')
         print(self._create_header(), file=self.output_file)
@@ -408,8 +371,7 @@ class GaQlOutput(QlGaOutput):
         self._create_filename()
         super().append_tag()
         # Creates folder to create the file
-        if os.path.isdir(self.path) is False:
-            os.makedirs(self.path)
+        os.makedirs(self.path, exist_ok=True)
 
         self.output_file = open(self.filename, 'w')
         print(self._create_header(), file=self.output_file)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Routes computed by a pool of processes, one task per origin. <18/10/2026>
+    v1.2 - Routes of an origin computed together (method "batched"). <18/10/2026>
+
+This module generates the k shortest routes of the OD pairs and keeps them in a cache on disk, so
+the runs of a parameter sweep (and the later sweeps) over the same network don't compute them
+again.
+
+The routes only depend on the network file, k, the base flow (the edge costs the KSP uses) and
+the method computing them: getKRoutes for each OD pair ("ksp") or the routes of all the OD pairs
+of an origin at once ("batched", see shortest_paths), which may break ties between routes of the
+same cost differently. The cache file is named after them, the network by the hash of its
+content, so a changed network file gets a new cache file instead of the old routes. The file is a
+NumPy .npz with the route set in flat arrays: the edge names, the edges of all the routes (indexes
+into the names) with the first entry of each route, the first route of each OD pair and the route
+costs.
+
+When they aren't in the cache, the routes can be computed by a pool of worker processes. The OD
+pairs of an origin are computed by the same task, and the results are put back in the order of the
+OD pairs, so the routes don't depend on the number of workers.
+"""
+import hashlib
+import multiprocessing
+import os
+
+import numpy as np
+
+import ksp.KSP as ksp
+from modules.experiment.shortest_paths import Graph
+
+METHODS = ("ksp", "batched")
+
+
+def network_hash(net_file):
+    """
+    Hash of the content of the network file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(net_file, 'rb') as network:
+        for block in iter(lambda: network.read(2 ** 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+#Network of a worker process (inherited from the parent)
+_graph = None
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _origin_routes(indexes, graph=None):
+    """
+    Routes of the OD pairs of the given indexes (all of the same origin).
+    """
+    vertices, edges, od_list, indexed = graph or _graph
+    if indexed is not None:
+        return indexed.origin_routes(od_list[indexes[0]].origin,
+                                     [(od_list[i].destination, od_list[i].num_paths)
+                                      for i in indexes])
+    return [ksp.getKRoutes(vertices, edges, od_list[i].origin, od_list[i].destination,
+                           od_list[i].num_paths)
+            for i in indexes]
+
+
+def origin_groups(od_list):
+    """
+    Indexes of the OD pairs of each origin, the origins in order of first appearance.
+    """
+    groups = {}
+    for i, od_pair in enumerate(od_list):
+        groups.setdefault(od_pair.origin, []).append(i)
+    return list(groups.values())
+
+
+def k_routes(vertices, edges, od_list, workers=1, method="ksp"):
+    """
+    Computes the k shortest routes of each OD pair (its num_paths routes).
+    In:
+        workers:Integer = Number of processes computing the routes, one origin at a time.
+        method:String = "ksp" (getKRoutes for each OD pair) or "batched" (the OD pairs of an
+                        origin at once, other route sets when routes of the same cost compete).
+    Out:
+        routes:List = Routes of each OD pair, as returned by getKRoutes.
+    """
+    if method not in METHODS:
+        raise Exception("Error: unknown KSP method: " + str(method))
+    #the routes are reported by edge name, which must tell the edges apart
+    if method == "batched" and len(set(edge.name for edge in edges)) < len(edges):
+        raise Exception("Error: the batched KSP method needs unique edge names"
+                        " (use --ksp-method ksp).")
+    graph = (vertices, edges, od_list, Graph(vertices, edges) if method == "batched" else None)
+    groups = origin_groups(od_list)
+    if workers < 2 or len(groups) < 2:
+        routes = [None] * len(od_list)
+        for group in groups:
+            for i, od_paths in zip(group, _origin_routes(group, graph)):
+                routes[i] = od_paths
+        return routes
+
+    #fork: the workers get the network without pickling it
+    context = multiprocessing.get_context("fork")
+    pool = context.Pool(min(workers, len(groups)), initializer=_init_worker, initargs=(graph,))
+    try:
+        #the largest origins first, so they don't end up last in a worker
+        order = sorted(range(len(groups)), key=lambda group: -len(groups[group]))
+        results = pool.map(_origin_routes, [groups[group] for group in order], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    routes = [None] * len(od_list)
+    for group, paths in zip(order, results):
+        for i, od_paths in zip(groups[group], paths):
+            routes[i] = od_paths
+    return routes
+
+
+def pack_routes(od_list, routes):
+    """
+    Flat arrays of the routes of each OD pair, see the module docstring.
+    """
+    names = {}
+    route_edges = []
+    route_indptr = [0]
+    route_costs = []
+    route_offsets = [0]
+    for paths in routes:
+        for path in paths:
+            route_edges.extend(names.setdefault(edge, len(names)) for edge in path[0])
+            route_indptr.append(len(route_edges))
+            route_costs.append(path[1])
+        route_offsets.append(len(route_costs))
+    return {
+        "edge_names": np.array(list(names), dtype=str),
+        "route_edges": np.array(route_edges, dtype=np.int32),
+        "route_indptr": np.array(route_indptr, dtype=np.int64),
+        "route_costs": np.array(route_costs, dtype=float),
+        "route_offsets": np.array(route_offsets, dtype=np.int64),
+        "ods": np.array([[str(od_pair.origin), str(od_pair.destination)] for od_pair in od_list],
+                        dtype=str).reshape(-1, 2),
+    }
+
+
+def unpack_routes(arrays):
+    """
+    Routes of each OD pair, in the getKRoutes format ([edge names, cost]), from pack_routes.
+    """
+    names = arrays["edge_names"].tolist()
+    edges = arrays["route_edges"].tolist()
+    indptr = arrays["route_indptr"].tolist()
+    costs = arrays["route_costs"].tolist()
+    offsets = arrays["route_offsets"].tolist()
+    paths = [[[names[edge] for edge in edges[indptr[i]:indptr[i + 1]]], costs[i]]
+             for i in range(len(costs))]
+    return [paths[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+class RouteCache(object):
+    """
+    Cache of the route sets of a network on disk.
+    In:
+        directory:String = Folder of the cache files.
+        net_file:String = Path to the network file.
+        k:Integer = Number of routes of each OD pair.
+        flow:Float = Base flow of the network.
+        method:String = Method computing the routes, see k_routes.
+    """
+    def __init__(self, directory, net_file, k, flow, method="ksp"):
+        self.directory = directory
+        self.method = method
+        network_name = os.path.splitext(os.path.basename(net_file))[0]
+        self.filename = os.path.join(directory, "{0}_k{1}_f{2}_{3}_{4}.npz".format(
+            network_name, k, flow, method, network_hash(net_file)))
+
+    def load(self, od_list):
+        """
+        Routes of each OD pair kept in the cache, or None when they aren't there (or the cache
+        file was written for other OD pairs).
+        """
+        ods = [[str(od_pair.origin), str(od_pair.destination)] for od_pair in od_list]
+        #a file missing some of the arrays (written by something else) is a miss too
+        try:
+            with np.load(self.filename) as arrays:
+                arrays = dict(arrays)
+            if arrays["ods"].tolist() != ods:
+                return None
+            return unpack_routes(arrays)
+        except (IOError, OSError, ValueError, KeyError, IndexError):
+            return None
+
+    def save(self, od_list, routes):
+        """
+        Writes the routes in the cache. The file is written aside and then renamed, so runs
+        reading or writing it at the same time never see a partial file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = "{0}.{1}.tmp.npz".format(self.filename[:-len(".npz")], os.getpid())
+        np.savez(temporary, **pack_routes(od_list, routes))
+        os.replace(temporary, self.filename)
+
+    def routes(self, vertices, edges, od_list, workers=1):
+        """
+        Routes of each OD pair, from the cache or computed (and then kept in the cache).
+        """
+        routes = self.load(od_list)
+        if routes is None:
+            routes = k_routes(vertices, edges, od_list, workers, self.method)
+            self.save(od_list, routes)
+        return routes
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module computes the k shortest routes of all the OD pairs of an origin at once, with Yen's
+algorithm over an indexed copy of the network.
+
+getKRoutes starts each OD pair from scratch: it searches the graph from the origin for the first
+route, and builds its view of the network again for every search. Here the network is indexed
+once (the edges leaving each node, by number), and a single search from each origin builds its
+shortest path tree, which has the first route of every destination of that origin. Only the spur
+searches of Yen's algorithm are made for each destination, as they depend on the routes found
+for it.
+
+The routes are in the format of getKRoutes ([edge names, cost]), the cost summed along the
+route. The routes found are shortest ones, but the ties aren't broken as getKRoutes does: the
+searches settle the nodes at the same distance in the order of their numbers, and the candidates
+of Yen's algorithm with the same cost are taken in the order they were found. When routes of the
+same cost compete, the route sets differ from those of getKRoutes, and so do the results of the
+runs using them: this is why getKRoutes stays the default. The edges are told apart by number
+here but reported by name, so the networks need unique edge names (see routes.k_routes).
+"""
+import heapq
+
+
+class Graph(object):
+    """
+    Indexed network: the nodes and edges by number, and the edges leaving each node.
+    In:
+        vertices:Node = List of the nodes of the network.
+        edges:Edge = List of the edges (name, start, end and cost).
+    """
+    def __init__(self, vertices, edges):
+        self.node_index = {}
+        for node in vertices:
+            self.node_index.setdefault(node.name, len(self.node_index))
+        for edge in edges:
+            self.node_index.setdefault(edge.start, len(self.node_index))
+            self.node_index.setdefault(edge.end, len(self.node_index))
+        self.names = [edge.name for edge in edges]
+        self.costs = [edge.cost for edge in edges]
+        self.tails = [self.node_index[edge.start] for edge in edges]
+        self.heads = [self.node_index[edge.end] for edge in edges]
+        #Edges leaving each node: (edge, head, cost)
+        self.out_edges = [[] for _ in range(len(self.node_index))]
+        for i, (tail, head, cost) in enumerate(zip(self.tails, self.heads, self.costs)):
+            self.out_edges[tail].append((i, head, cost))
+
+    def search(self, source, target=None, banned_edges=(), banned_nodes=()):
+        """
+        Dijkstra's search from source, until target is reached (or over the whole network).
+        In:
+            source:Integer = Node the search starts at.
+            target:Integer = Node the search stops at (None searches every node).
+            banned_edges:Set = Edges the routes can't use.
+            banned_nodes:Set = Nodes the routes can't go through.
+        Out:
+            predecessors:Dictionary = Edge reaching each node on its shortest route.
+        """
+        distances = {source: 0.0}
+        predecessors = {}
+        settled = set()
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+            if node == target:
+                break
+            for edge, head, cost in self.out_edges[node]:
+                if head in settled or edge in banned_edges or head in banned_nodes:
+                    continue
+                new_distance = distance + cost
+                if head not in distances or new_distance < distances[head]:
+                    distances[head] = new_distance
+                    predecessors[head] = edge
+                    heapq.heappush(heap, (new_distance, head))
+        return predecessors
+
+    def route(self, predecessors, source, target):
+        """
+        Edges of the route from source to target in the search tree (None if not reached).
+        """
+        if target != source and target not in predecessors:
+            return None
+        edges = []
+        node = target
+        while node != source:
+            edge = predecessors[node]
+            edges.append(edge)
+            node = self.tails[edge]
+        return edges[::-1]
+
+    def cost(self, route):
+        return sum(self.costs[edge] for edge in route)
+
+    def yen(self, origin, destination, k, first):
+        """
+        Yen's algorithm from the first (shortest) route.
+        Out:
+            routes:List = Up to k routes (lists of edges), the cheapest first.
+        """
+        found = [first]
+        candidates = []
+        known = {tuple(first)}
+        while len(found) < k:
+            last = found[-1]
+            for i in range(len(last)):
+                spur = self.tails[last[i]]
+                root = last[:i]
+                banned_edges = set(route[i] for route in found if route[:i] == root)
+                banned_nodes = set(self.tails[edge] for edge in root)
+                spur_route = self.route(self.search(spur, destination, banned_edges,
+                                                    banned_nodes), spur, destination)
+                if spur_route is None:
+                    continue
+                route = root + spur_route
+                if tuple(route) not in known:
+                    known.add(tuple(route))
+                    heapq.heappush(candidates, (self.cost(route), len(known), route))
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[2])
+        return found
+
+    def origin_routes(self, origin, destinations):
+        """
+        k shortest routes from origin to each destination, with one search from the origin.
+        In:
+            origin:String = Name of the origin node.
+            destinations:List = Name of each destination node and its number of routes (k).
+        Out:
+            routes:List = Routes of each destination, in the getKRoutes format.
+        """
+        source = self.node_index.get(origin)
+        tree = self.search(source) if source is not None else {}
+        routes = []
+        for destination, k in destinations:
+            target = self.node_index.get(destination)
+            first = None
+            if source is not None and target is not None:
+                first = self.route(tree, source, target)
+            if first is None or k < 1:
+                routes.append([])
+                continue
+            routes.append([[[self.names[edge] for edge in route], self.cost(route)]
+                           for route in self.yen(source, target, k, first)])
+        return routes
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Malformed token lists raise ValueError instead of IndexError. <18/10/2026>
+
+This module turns the cost formulas parsed by py_expression_eval into plain Python callables,
+so a formula is parsed once and then evaluated without walking its token list again.
+"""
+#Python native modules
+import math
+#Third-party modules
+import numpy as np
+from py_expression_eval import TNUMBER, TOP1, TOP2, TVAR, TFUNCALL
+
+#Binary operators and the Python operator each one becomes
+BINARY_OPERATORS = {'+': '+', '-': '-', '*': '*', '/': '/', '%': '%', '^': '**', '**': '**'}
+
+#Names available to the compiled formulas when evaluated with scalar values
+SCALAR_NAMESPACE = {
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'log': math.log,
+    'abs': abs,
+    'min': min,
+    'max': max,
+    'pow': math.pow,
+}
+
+#Names available to the compiled formulas when evaluated element-wise over NumPy arrays
+VECTOR_NAMESPACE = {
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'abs': np.abs,
+    'min': np.minimum,
+    'max': np.maximum,
+    'pow': np.power,
+}
+
+
+def _pop(stack, count, expression):
+    """
+    Takes the last count operands of the stack; a token list missing operands (e.g. 'f*-1', which
+    py_expression_eval parses as f * 1 -) raises ValueError, with the tokens in postfix order.
+    """
+    if len(stack) < count:
+        tokens = ' '.join(str(token.number_ if token.type_ == TNUMBER else token.index_)
+                          for token in expression.tokens)
+        raise ValueError("malformed expression (missing operand): " + tokens)
+    operands = stack[-count:]
+    del stack[-count:]
+    return operands
+
+
+def compile_expression(expression, variables, namespace=None):
+    """
+    Compile a parsed expression into a callable taking the given variables as positional arguments.
+
+    Only the arithmetic subset used by the network files is supported (numbers, variables,
+    + - * / % ^, unary minus and the functions in the namespace); anything else raises
+    ValueError so the caller can keep evaluating through the expression itself.
+
+    In:
+        expression:Expression = Expression returned by py_expression_eval's Parser.parse.
+        variables:List = Names of the variables, in the order of the callable arguments.
+        namespace:Dictionary = Functions visible to the formula (default: SCALAR_NAMESPACE).
+    Out:
+        function:Function = The compiled formula.
+
+    >>> from py_expression_eval import Parser
+    >>> compile_expression(Parser().parse('t*(1+0.15*(f/c)^4)'), ['f', 't', 'c'])(100, 2.0, 100.0)
+    2.3
+    >>> compile_expression(Parser().parse('f*-1'), ['f'])
+    Traceback (most recent call last):
+    ...
+    ValueError: malformed expression (missing operand): f * 1 -
+    """
+    if namespace is None:
+        namespace = SCALAR_NAMESPACE
+    arguments = {}
+    for index, name in enumerate(variables):
+        arguments[name] = '_v%d' % index
+
+    stack = []
+    for token in expression.tokens:
+        if token.type_ == TNUMBER:
+            if isinstance(token.number_, bool) or not isinstance(token.number_, (int, float)):
+                raise ValueError("unsupported constant: %r" % (token.number_,))
+            stack.append('(%r)' % token.number_)
+        elif token.type_ == TVAR:
+            if token.index_ in arguments:
+                stack.append(arguments[token.index_])
+            elif token.index_ in namespace:
+                stack.append(token.index_)
+            else:
+                raise ValueError("undefined variable: " + token.index_)
+        elif token.type_ == TOP2:
+            left, right = _pop(stack, 2, expression)
+            if token.index_ == ',':
+                stack.append('%s, %s' % (left, right))
+            elif token.index_ in BINARY_OPERATORS:
+                stack.append('(%s %s %s)' % (left, BINARY_OPERATORS[token.index_], right))
+            else:
+                raise ValueError("unsupported operator: " + token.index_)
+        elif token.type_ == TOP1:
+            operand, = _pop(stack, 1, expression)
+            if token.index_ == '-':
+                stack.append('(-%s)' % operand)
+            elif token.index_ in namespace:
+                stack.append('%s(%s)' % (token.index_, operand))
+            else:
+                raise ValueError("unsupported function: " + token.index_)
+        elif token.type_ == TFUNCALL:
+            function, args = _pop(stack, 2, expression)
+            if function not in namespace:
+                raise ValueError("unsupported function: " + function)
+            stack.append('%s(%s)' % (function, args))
+        else:
+            raise ValueError("invalid expression")
+
+    if len(stack) != 1:
+        raise ValueError("invalid expression (parity)")
+
+    source = 'lambda %s: %s' % (', '.join(arguments[name] for name in variables), stack[0])
+    return eval(source, dict(namespace))
@@ -3,6 +3,8 @@
 """
 Changelog:
     V1.0 - Created. <08/03/2017>
+    V1.1 - read_infos reads the network file once, without the KSP parser. <18/10/2026>
+    V1.2 - appendTag reserves the output file, so parallel runs never share it. <18/10/2026>
 
 Author: Arthur Zachow Coelho (arthur.zachow@gmail.com)
 Created: 08/03/2017
@@ -13,6 +15,7 @@ This module contains the functions used in the simulation.
 import string
 import os
 import sys
+from time import localtime
 #Third-party modules
 from py_expression_eval import Parser
 #Own modules
@@ -89,9 +92,74 @@ def clean_od_table(od_list, k):
 
     return table_fill
 
+def appendTag(fn_wo_tag):
+    """
+    Appends the time and, when a file with that name already exists, a number to the filename.
+    The file is created here (O_EXCL), along with its folder, so runs started at the same time
+    never get the same name.
+
+    In:
+        fn_wo_tag:String = Filename without the tag.
+    Out:
+        filenamewithtag:String = Filename with the tag, of an empty file.
+    """
+    time = localtime()
+    fn_wo_tag += str(time[3]) + 'h' + str(time[4]) + 'm' + str(time[5]) + 's'
+    directory = os.path.dirname(fn_wo_tag)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    append_number = ''
+    while True:
+        try:
+            os.close(os.open(fn_wo_tag + append_number + ".txt",
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            if append_number == '':
+                append_number = "-1"
+            else:
+                append_number = "-" + str(int(append_number[1:]) + 1)
+    return fn_wo_tag + append_number + ".txt"
+
+def _edge_costs(functions, expressions, formulas, name, constants, flow):
+    """
+    Cost formula (simplified with the constants of the edge), template, constants and cost at
+    the base flow of an edge with the given function and constants.
+    The formulas are parsed once per function and simplified once per set of constants.
+    """
+    formula, variables = functions[name]
+    expression = expressions.get(name)
+    if expression is None:
+        expression = expressions[name] = Parser().parse(formula)
+    key = (name, tuple(constants))
+    edge_formula = formulas.get(key)
+    if edge_formula is None:
+        values = {}
+        if constants:
+            ##the constants take the formula variables that aren't arguments, in order
+            names = [v for v in expression.variables() if v not in variables]
+            for index in range(len(names)):
+                values[names[index]] = float(constants[index])
+            if not any(v in expression.variables() for v in variables):
+                cost_formula = str(expression.evaluate(values))
+            else:
+                cost_formula = expression.simplify(values).toString()
+        elif is_number(formula):
+            cost_formula = formula
+        else:
+            cost_formula = expression.toString()
+        arguments = dict(values)
+        for v in variables:
+            arguments[v] = flow
+        edge_formula = formulas[key] = (cost_formula, (formula, variables), values,
+                                        expression.evaluate(arguments))
+    return edge_formula
+
+
 def read_infos(graph_file, flow):
     """
     Read the edges and OD pairs from the file in this program format(with the functions of each).
+    The file is read once, line by line; the cost of each edge is evaluated at the base flow.
     In:
         graph_file:String = Path to the network file.
         flow:Integer = Base flow of the network.
@@ -101,101 +169,45 @@ def read_infos(graph_file, flow):
         od_list:OD = List of OD pairs of the network.
     """
     functions = {}
+    expressions = {}
+    formulas = {}
+    vertices = []
     new_edges = []
     od_list = []
 
-    #Uses the KSP function to get the infos
-    vertices, edges, _ = KSP.generateGraph(graph_file, flow=flow)
-
-    #Read again the file to store information in the correct form
     for line in open(graph_file, 'r'):
-        taglist = string.split(line)
+        taglist = line.split()
+        if not taglist or taglist[0].startswith('#'):
+            continue
         if taglist[0] == 'function':
-            variables = []
             variables = taglist[2].replace('(', '')
             variables = variables.replace(')', '')
             variables = variables.split(',')
             functions[taglist[1]] = [taglist[3], variables]
 
-        elif taglist[0] == 'dedge' or taglist[0] == 'edge':
-            constants = []
-            cost_formula = ""
-            freeflow_cost = 0
-            constant_acc = 0
-            if len(taglist) > 5:
-                i = 5
-                while i <= (len(taglist) - 1):
-                    constants.append(taglist[i])
-                    i += 1
-                parser = Parser()
-                ##[4] is function name.[0] is expression
-                exp = parser.parse(functions[taglist[4]][0])
-                LV = exp.variables()
-                buffer_LV = []
-                for l in LV:
-                    if l not in functions[taglist[4]][1]:
-                        constant_acc += 1
-                        buffer_LV.append(l)
-
-                #check if the formula has any parameters(variables)
-                flag = False
-                for v in functions[taglist[4]][1]:
-                    if v in LV:
-                        flag = True
-
-                buffer_dic = {}
-                i = 0
-                for index in range(constant_acc):
-                    buffer_dic[buffer_LV[index]] = float(constants[index])
-                    i = 1
-
-                if not flag:
-                    freeflow_cost = exp.evaluate(buffer_dic)
-                    cost_formula = str(freeflow_cost)
-
-                elif is_number(functions[taglist[4]][0]):
-                    cost_fomula = functions[taglist[4]][0]
-
-                else:
-                    exp = exp.simplify(buffer_dic)
-                    cost_formula = exp.toString()
-
-                for edge in edges:
-                    if edge.name == taglist[1] and (edge.start == taglist[2] \
-                        or edge.start == taglist[3]) and (edge.end == taglist[2] \
-                        or edge.end == taglist[3]):
-                        new_edges.append(Classes.EdgeRC(edge.name, edge.start, edge.end, edge.cost,
-                                                        cost_formula))
-                        if taglist[0] == 'edge':
-                            new_edges.append(Classes.EdgeRC('%s-%s'%(edge.end, edge.start), edge.end,
-                                                            edge.start, edge.cost, cost_formula))
+        elif taglist[0] == 'node':
+            vertices.append(KSP.Node(taglist[1]))
 
-            else:
-                cost_formula = ""
-                freeflow_cost = 0
-                parser = Parser()
-                if is_number(functions[taglist[4]][0]):
-                    cost_formula = functions[taglist[4]][0]
-
-                else:
-                    exp = parser.parse(functions[taglist[4]][0])
-                    cost_formula = exp.toString()
-
-                for edge in edges:
-                    if edge.name == taglist[1] and (edge.start == taglist[2] or edge.start == taglist[3]) \
-                    and (edge.end == taglist[2] or edge.end == taglist[3]):
-                        new_edges.append(Classes.EdgeRC(edge.name, edge.start, edge.end, edge.cost,
-                                                        cost_formula))
-                        if taglist[0] == 'edge':
-                            new_edges.append(Classes.EdgeRC(edge.name, edge.end, edge.start, edge.cost,
-                                                            cost_formula))
+        elif taglist[0] == 'dedge' or taglist[0] == 'edge':
+            name, start, end = taglist[1], taglist[2], taglist[3]
+            constants = taglist[5:]
+            cost_formula, template, buffer_dic, cost = _edge_costs(functions, expressions,
+                                                                   formulas, taglist[4],
+                                                                   constants, flow)
+            new_edges.append(Classes.EdgeRC(name, start, end, cost, cost_formula, template,
+                                            dict(buffer_dic)))
+            if taglist[0] == 'edge':
+                #the reverse edge is named after its endpoints when the function has constants
+                reverse_name = '%s-%s' % (end, start) if constants else name
+                new_edges.append(Classes.EdgeRC(reverse_name, end, start, cost, cost_formula,
+                                                template, dict(buffer_dic) if constants else {}))
 
         elif taglist[0] == 'od':
             od_list.append((taglist[2], taglist[3], float(taglist[4])))
 
-    return  vertices, new_edges, od_list
+    return vertices, new_edges, od_list
+
 
-# Print iterations progress
 def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_length=100):
     """
     Got from: https://gist.github.com/aubricus/f91fb55dc6ba5557fbab06119420dd6a
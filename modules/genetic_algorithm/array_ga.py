@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Whole population scored in one call by a batch evaluator. <18/10/2026>
+    v1.2 - Children scored from the differences to their parents. <18/10/2026>
+    v1.3 - Optional cache of the scores. <18/10/2026>
+    v1.4 - The stop on convergence can be disabled (islands). <18/10/2026>
+    v1.5 - Initial population seeded with given genomes. <18/10/2026>
+    v1.6 - The children carry the genes changed by the operators to the delta scoring. <18/10/2026>
+    v1.7 - Swap mutation, as the G1DList genomes of pyevolve. <18/10/2026>
+
+This module has a genetic algorithm engine that keeps the whole population in one integer matrix
+(population x drivers), instead of one pyevolve genome object per individual.
+
+It follows the generation loop of pyevolve's GSimpleGA as used by the GA class: rank selection,
+single point crossover, swap mutation (the default operators of the G1DList genomes), elitism and a
+step callback run before each generation, which receives the engine and can stop the evolution by
+returning True.
+"""
+import numpy as np
+
+
+def genome_dtype(num_routes):
+    """
+    Smallest unsigned integer type holding the route indexes.
+    """
+    highest = int(np.max(num_routes)) if len(num_routes) else 1
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if highest - 1 <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class ArrayIndividual(object):
+    """
+    View of one individual (one row) of the population matrix, with the methods of the pyevolve
+    genomes used by the step callbacks.
+    """
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+
+    @property
+    def score(self):
+        return float(self.engine.scores[self.index])
+
+    def getInternalList(self):
+        """
+        The genome, as a view of the population row: changing it changes the individual.
+        """
+        return self.engine.population[self.index]
+
+    def setInternalList(self, genome):
+        self.engine.population[self.index] = genome
+
+    def evaluate(self, **args):
+        self.engine.evaluate_rows([self.index])
+
+    def copy(self, other):
+        """
+        Copies this genome and its score to another individual.
+        """
+        other.engine.population[other.index] = self.engine.population[self.index]
+        other.engine.scores[other.index] = self.engine.scores[self.index]
+        if other.engine.flows is not None:
+            other.engine.flows.copy_row(self.engine.flows, self.index, other.index)
+
+    def __repr__(self):
+        return "ArrayIndividual(%d, score=%s)" % (self.index, self.score)
+
+
+class ArrayPopulation(object):
+    """
+    The population of the engine, indexed like pyevolve's GPopulation (sorted, best first).
+    """
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __len__(self):
+        return self.engine.population_size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("individual index out of range")
+        return ArrayIndividual(self.engine, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ArrayIndividual(self.engine, index)
+
+    def bestRaw(self, index=0):
+        return self[index]
+
+
+class ArrayGA(object):
+    """
+    Genetic algorithm over a population matrix, minimizing the score.
+    In:
+        num_routes:Array = Number of routes (alleles) of each driver (gene).
+        population_size:Integer = Number of individuals.
+        generations:Integer = Number of generations.
+        crossover:Float = Probability of crossover of each pair of parents.
+        mutation:Float = Probability of mutation of each gene.
+        elite:Integer = Number of best individuals kept from one generation to the next.
+        evaluator:Function = Score of a genome (lower is better).
+        step_callback:Function = Called with the engine before each generation.
+        batch_evaluator:Function = Scores of several genomes at once (one row each), used
+                                   instead of evaluator when given.
+        flows:PopulationFlows = Scores the children from the differences to their parents, used
+                                instead of the evaluators when given.
+        cache:FitnessCache = Cache of the scores given by the evaluators.
+        stop_on_convergence:Boolean = Stops when every individual has the same score.
+        seeds:Array = Genomes put in the initial population (one row each).
+        seed_rows:Integer = Individuals of the initial population taken from the seeds, the
+                            seeds are repeated with a seed_mutation perturbation to fill them.
+    """
+    seed_mutation = 0.05
+
+    def __init__(self, num_routes, population_size, generations, crossover, mutation, elite,
+                 evaluator, step_callback=None, batch_evaluator=None, flows=None,
+                 cache=None, stop_on_convergence=True, seeds=None, seed_rows=0):
+        self.num_routes = np.asarray(num_routes, dtype=np.int64)
+        self.num_genes = len(self.num_routes)
+        self.population_size = population_size
+        self.generations = generations
+        self.crossover = crossover
+        self.mutation = mutation
+        self.elite = elite
+        self.evaluator = evaluator
+        self.step_callback = step_callback
+        self.batch_evaluator = batch_evaluator
+        self.flows = flows
+        self.cache = cache
+        self.stop_on_convergence = stop_on_convergence
+        self.seeds = seeds
+        self.seed_rows = seed_rows
+        self.dtype = genome_dtype(self.num_routes)
+        self.population = None
+        self.scores = None
+        self.current_generation = 0
+
+    def random_genes(self, rows, genes):
+        """
+        Random valid routes for the given genes (same shape as genes), for rows individuals.
+        """
+        return (np.random.random_sample((rows,) + np.shape(genes))
+                * self.num_routes[genes]).astype(self.dtype)
+
+    def random_population(self, rows):
+        """
+        Random genomes, one per row.
+        """
+        return self.random_genes(rows, np.arange(self.num_genes))
+
+    def initialize(self):
+        """
+        Random initial population.
+        """
+        self.population = self.random_population(self.population_size)
+        if self.seeds is not None and len(self.seeds):
+            rows = min(self.seed_rows, self.population_size)
+            self.population[:rows] = np.asarray(self.seeds)[np.arange(rows) % len(self.seeds)]
+            if rows > len(self.seeds):
+                self.perturb(self.population[len(self.seeds):rows], self.seed_mutation)
+        self.scores = np.zeros(self.population_size)
+        if self.flows is not None:
+            self.scores = self.flows.evaluate(self.population)
+        else:
+            self.evaluate_rows(range(self.population_size))
+        self.sort()
+
+    def evaluate_rows(self, rows):
+        """
+        Scores the given individuals.
+        """
+        if self.flows is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            self.scores[rows] = self.flows.update(self.population, rows)
+            return
+        if self.batch_evaluator is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+            if self.cache is not None:
+                self.scores[rows] = self.cache.evaluate_batch(self.population[rows],
+                                                              self.batch_evaluator)
+            else:
+                self.scores[rows] = self.batch_evaluator(self.population[rows])
+            return
+        for row in rows:
+            if self.cache is not None:
+                self.scores[row] = self.cache.evaluate(self.population[row], self.evaluator)
+            else:
+                self.scores[row] = self.evaluator(self.population[row])
+
+    def sort(self):
+        """
+        Sorts the population, best individual first.
+        """
+        order = np.argsort(self.scores, kind='stable')
+        self.population = self.population[order]
+        self.scores = self.scores[order]
+        if self.flows is not None:
+            self.flows.take(order)
+
+    def select(self, count):
+        """
+        Rank selection: picks at random among the individuals with the best score, as pyevolve's
+        GRankSelector.
+        """
+        ties = int(np.count_nonzero(self.scores == self.scores[0]))
+        return np.random.randint(0, ties, size=count)
+
+    def breed(self):
+        """
+        Children of the current population: single point crossover of each pair of selected
+        parents (with probability crossover, else copies of them) followed by the mutation of
+        each gene with probability mutation.
+        Out:
+            children:Array = The genomes of the children.
+            bases:Array = Row of the parent closest to each child (before the mutation).
+            changes:List = Genes of each child that may differ from its base (the crossed
+                           segment and the mutated genes), or None when they aren't known.
+        """
+        pairs = (self.population_size + 1) // 2
+        mom_rows = self.select(pairs)
+        dad_rows = self.select(pairs)
+        moms = self.population[mom_rows]
+        dads = self.population[dad_rows]
+        cuts = self.cut_points(pairs)
+        if cuts is not None:
+            crossed = np.random.random_sample(pairs) < self.crossover
+            tail = (np.arange(self.num_genes) >= cuts[:, None]) & crossed[:, None]
+            sisters = np.where(tail, dads, moms)
+            brothers = np.where(tail, moms, dads)
+            #the sister has the head of the mom, the brother the head of the dad
+            from_mom = np.count_nonzero(tail & (moms != dads), axis=1) * 2 <= self.num_genes
+            #both children differ from their base in the tail (base: the mom of the sister), or
+            #in the head; only when crossed
+            starts = np.where(crossed & ~from_mom, 0, np.where(crossed, cuts, 0))
+            stops = np.where(crossed & ~from_mom, cuts, np.where(crossed, self.num_genes, 0))
+        else:
+            sisters, brothers = moms, dads
+            from_mom = np.ones(pairs, dtype=bool)
+            starts = stops = np.zeros(pairs, dtype=np.intp)
+        children = np.empty((2 * pairs, self.num_genes), dtype=self.dtype)
+        children[0::2] = sisters
+        children[1::2] = brothers
+        children = children[:self.population_size]
+        bases = np.empty(2 * pairs, dtype=np.intp)
+        bases[0::2] = np.where(from_mom, mom_rows, dad_rows)
+        bases[1::2] = np.where(from_mom, dad_rows, mom_rows)
+        bases = bases[:self.population_size]
+        mutated = self.mutate(children)
+        if mutated is None:
+            return children, bases, None
+        mutated = np.sort(mutated)
+        ends = np.cumsum(np.bincount(mutated // self.num_genes, minlength=self.population_size))
+        changes = []
+        for child, genes in enumerate(np.split(mutated % self.num_genes, ends[:-1])):
+            start, stop = starts[child // 2], stops[child // 2]
+            #the mutated genes out of the crossed segment, once each
+            outside = np.unique(genes[(genes < start) | (genes >= stop)])
+            changes.append(np.concatenate([np.arange(start, stop), outside]))
+        return children, bases, changes
+
+    def cut_points(self, pairs):
+        """
+        Crossover point of each pair of parents (the first gene taken from the other parent), or
+        None when the genomes can't be cut.
+        """
+        if self.num_genes < 2:
+            return None
+        return np.random.randint(1, self.num_genes, size=pairs)
+
+    def perturb(self, genomes, rate):
+        """
+        Draws a new route for each gene of the genomes, in place, with probability rate (e.g. to
+        spread the copies of the seeds, which swaps of equal routes wouldn't change).
+        """
+        total = genomes.size
+        changes = np.random.binomial(total, rate) if rate > 0 else 0
+        if changes:
+            positions = np.random.randint(0, total, size=changes)
+            genomes.reshape(-1)[positions] = self.random_genes(1, positions % self.num_genes)[0]
+
+    def mutate(self, children, rate=None):
+        """
+        Swap mutation, as pyevolve's G1DListMutatorSwap (the mutator of the G1DList genomes of
+        the GA class), on each child in place: with rate * genes < 1, each gene is swapped with
+        probability mutation (or rate) with a random gene of the same child; otherwise
+        round(rate * genes) pairs of random genes are swapped. A swap giving a driver a route it
+        doesn't have (its OD pair has less than k routes) is skipped, where pyevolve would make
+        the genome invalid.
+        Out:
+            positions:Array = Positions of the swapped genes in the flattened children.
+        """
+        rate = self.mutation if rate is None else rate
+        rows = len(children)
+        expected = rate * self.num_genes
+        if rate <= 0 or rows == 0 or self.num_genes < 2:
+            return np.zeros(0, dtype=np.intp)
+        if expected < 1.0:
+            total = rows * self.num_genes
+            #the genes drawn, in the order pyevolve visits them
+            firsts = np.sort(np.random.randint(0, total, size=np.random.binomial(total, rate)))
+            seconds = (firsts // self.num_genes) * self.num_genes \
+                + np.random.randint(0, self.num_genes, size=len(firsts))
+            swaps = [(firsts[i:i + 1], seconds[i:i + 1]) for i in range(len(firsts))]
+        else:
+            #one swap of every child at a time, as they follow each other in a genome
+            offsets = np.arange(rows) * self.num_genes
+            swaps = [(offsets + np.random.randint(0, self.num_genes, size=rows),
+                      offsets + np.random.randint(0, self.num_genes, size=rows))
+                     for _ in range(int(round(expected)))]
+        genes = children.reshape(-1)
+        positions = []
+        for firsts, seconds in swaps:
+            first_values = genes[firsts]
+            second_values = genes[seconds]
+            valid = (self.num_routes[firsts % self.num_genes] > second_values) \
+                & (self.num_routes[seconds % self.num_genes] > first_values)
+            firsts, seconds = firsts[valid], seconds[valid]
+            genes[firsts] = second_values[valid]
+            genes[seconds] = first_values[valid]
+            positions.extend((firsts, seconds))
+        if not positions:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate(positions)
+
+    def to_actions(self, genome):
+        """
+        Route of each driver of a genome.
+        """
+        return genome
+
+    def from_actions(self, actions):
+        """
+        Genome of the given routes of the drivers.
+        """
+        return actions
+
+    def step(self):
+        """
+        Creates the next generation. Returns True when the last generation is reached.
+        """
+        self.sort()
+        parents = self.population
+        parent_scores = self.scores
+        parent_flows = self.flows
+        self.population, bases, changes = self.breed()
+        if self.flows is not None:
+            self.flows = parent_flows.derive(self.population, bases, changes)
+            self.scores = self.flows.averages()
+        else:
+            self.scores = np.zeros(self.population_size)
+            self.evaluate_rows(range(self.population_size))
+        self.sort()
+
+        #Elitism: the best parents replace the worst children they beat
+        for i in range(min(self.elite, self.population_size)):
+            if parent_scores[i] < self.scores[i]:
+                self.population[self.population_size - 1 - i] = parents[i]
+                self.scores[self.population_size - 1 - i] = parent_scores[i]
+                if self.flows is not None:
+                    self.flows.copy_row(parent_flows, i, self.population_size - 1 - i)
+        self.sort()
+        self.current_generation += 1
+        return self.current_generation == self.generations
+
+    def evolve(self, freq_stats=0):
+        """
+        Runs the evolution.
+        In:
+            freq_stats:Integer = Generations between two printed statistics (0 prints nothing).
+        """
+        self.initialize()
+        while True:
+            stop = False
+            if self.step_callback is not None:
+                stop = self.step_callback(self)
+            if freq_stats and self.current_generation % freq_stats == 0:
+                self.print_stats()
+            #stops when every individual has the same score, as pyevolve's RawStatsCriteria
+            if stop or (self.stop_on_convergence and np.all(self.scores == self.scores[0])) \
+                    or self.step():
+                break
+        return self.bestIndividual()
+
+    def print_stats(self):
+        print("Gen. {0} ({1:.2f}%): Max/Min/Avg Raw [{2:.2f}/{3:.2f}/{4:.2f}]".format(
+            self.current_generation, 100.0 * self.current_generation / max(1, self.generations),
+            self.scores.max(), self.scores.min(), self.scores.mean()))
+
+    def getPopulation(self):
+        return ArrayPopulation(self)
+
+    def getCurrentGeneration(self):
+        return self.current_generation
+
+    def bestIndividual(self):
+        return ArrayIndividual(self, int(np.argmin(self.scores)))
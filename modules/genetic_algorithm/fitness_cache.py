@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module has a bounded cache of the scores of the GA genomes, so a genome already scored
+(an elite, a copy of a parent or a solution injected by QL) isn't simulated again.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+def genome_key(genome):
+    """
+    128-bit digest of a genome (a list or an array of routes).
+    """
+    genome = np.ascontiguousarray(genome)
+    if genome.dtype == object:
+        genome = genome.astype(np.int64)
+    digest = hashlib.blake2b(genome.tobytes(), digest_size=16)
+    digest.update(genome.dtype.str.encode())
+    return digest.digest()
+
+
+class FitnessCache(object):
+    """
+    Least recently used cache of scores by genome.
+    In:
+        size:Integer = Maximum number of genomes kept (0 disables the cache).
+    """
+    def __init__(self, size=1024):
+        self.size = size
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Score of a genome key, or None when it isn't cached.
+        """
+        score = self.scores.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.scores.move_to_end(key)
+        return score
+
+    def put(self, key, score):
+        if self.size <= 0:
+            return
+        self.scores[key] = score
+        self.scores.move_to_end(key)
+        if len(self.scores) > self.size:
+            self.scores.popitem(last=False)
+
+    def evaluate(self, genome, evaluator):
+        """
+        Score of a genome, from the cache or from evaluator.
+        """
+        key = genome_key(genome)
+        score = self.get(key)
+        if score is None:
+            score = evaluator(genome)
+            self.put(key, score)
+        return score
+
+    def evaluate_batch(self, population, batch_evaluator):
+        """
+        Scores of several genomes (one per row): only the ones not cached, and each distinct
+        genome once, are passed to batch_evaluator.
+        """
+        population = np.asarray(population)
+        keys = [genome_key(genome) for genome in population]
+        scores = np.zeros(len(keys))
+        missing = OrderedDict()
+        for row, key in enumerate(keys):
+            if key in missing:
+                #same genome as an earlier row of the batch
+                self.hits += 1
+                missing[key].append(row)
+                continue
+            score = self.get(key)
+            if score is None:
+                missing[key] = [row]
+            else:
+                scores[row] = score
+        if missing:
+            first = [rows[0] for rows in missing.values()]
+            for (key, rows), score in zip(missing.items(),
+                                          batch_evaluator(population[first])):
+                scores[rows] = score
+                self.put(key, float(score))
+        return scores
+
+    def statistics(self):
+        """
+        Text with the hits and misses of the cache.
+        """
+        total = self.hits + self.misses
+        return "Fitness cache: {0} hits, {1} misses ({2:.1f}% hits), {3} genomes kept".format(
+            self.hits, self.misses, 100.0 * self.hits / max(1, total), len(self.scores))
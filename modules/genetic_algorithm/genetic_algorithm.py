@@ -2,6 +2,12 @@
 """
 Changelog:
     v1.0 - Changelog created. <08/03/2017>
+    v1.1 - Native array-based engine as an alternative to pyevolve. <18/10/2026>
+    v1.2 - Batch evaluation of the population with the native engine. <18/10/2026>
+    v1.3 - Native engine scoring the children from their parents' flows. <18/10/2026>
+    v1.4 - LRU cache of the scores of the genomes. <18/10/2026>
+    v1.5 - Route-split encoding (drivers per route of each OD pair). <18/10/2026>
+    v1.6 - Native engines seeded with heuristic solutions. <18/10/2026>
 
 Created on Thu Jun 18 19:50:56 2015
 Author: Thiago
@@ -9,14 +15,19 @@ Maintainer: Arthur Zachow Coelho (arthur.zachow@gmail.com)
 
 This module run the GA experimets.
 """
-from pyevolve import G1DList, GSimpleGA, Selectors
-from pyevolve import Consts
-from pyevolve import GAllele
+import numpy as np
+
+from modules.experiment.classes import od_indexes
+from modules.genetic_algorithm.array_ga import ArrayGA
+from modules.genetic_algorithm.fitness_cache import FitnessCache
+from modules.genetic_algorithm.split_ga import RouteSplitGA
 
 
 class GA(object):
     def __init__(self, generations, population, crossover, mutation, elite, experiment, genCallBack,
-                 evalFunc, drivers):
+                 evalFunc, drivers, engine="pyevolve", batchEvalFunc=None,
+                 populationFlows=None, cacheSize=1024, encoding="driver", incidence=None,
+                 seeds=None, seedRows=0):
         self.experiment = experiment
         self.population = population
         self.crossoverProb = crossover
@@ -26,14 +37,53 @@ class GA(object):
         self.genCallBack = genCallBack
         self.evalFunc = evalFunc
         self.drivers = drivers
+        self.engine = engine
+        self.batchEvalFunc = batchEvalFunc
+        self.populationFlows = populationFlows
+        self.encoding = encoding
+        self.seeds = seeds
+        self.seedRows = seedRows
+        #scores of the genomes already evaluated
+        self.cache = FitnessCache(cacheSize) if cacheSize > 0 else None
+
+        # number of routes of each driver
+        driver_od, od_list = od_indexes(drivers)
+        num_routes = np.array([len(od.paths) for od in od_list], dtype=int)[driver_od]
+
+        if encoding == "split" and engine != "native":
+            raise Exception("Error: the route-split encoding needs the native GA engine.")
+
+        if encoding == "split":
+            # native engine, one column per route of each OD pair with its number of drivers;
+            # the evaluators score route counts
+            self.ga = RouteSplitGA(incidence, self.population, self.generations,
+                                   self.crossoverProb, self.mutationProb, self.elite, self.evalFunc,
+                                   self.genCallBack, batch_evaluator=self.batchEvalFunc,
+                                   cache=self.cache, seeds=self.seeds, seed_rows=self.seedRows)
+            return
+
+        if engine == "native":
+            # the whole population is a matrix, one row per individual and one column per driver
+            self.ga = ArrayGA(num_routes, self.population, self.generations, self.crossoverProb,
+                              self.mutationProb, self.elite, self.evalFunc, self.genCallBack,
+                              batch_evaluator=self.batchEvalFunc, flows=self.populationFlows,
+                              cache=self.cache, seeds=self.seeds, seed_rows=self.seedRows)
+            return
+
+        if seeds is not None:
+            raise Exception("Error: the seeding of the population needs the native GA engine.")
+
+        from pyevolve import G1DList, GSimpleGA, Selectors
+        from pyevolve import Consts
+        from pyevolve import GAllele
 
         # sets pyevolve
         # create alleles to make a GA model. each driver is represented as an allele
         # each driver can take k different routes which is modelled by the different
         # values each allele can take
         driversAlleles = GAllele.GAlleles()
-        for dr in drivers:
-            lst = GAllele.GAlleleList(range(dr.od.numPaths))
+        for routes in num_routes:
+            lst = GAllele.GAlleleList(range(routes))
             driversAlleles.add(lst)
         # define a genome with length = length of drivers
         genome = G1DList.G1DList(len(drivers))
@@ -63,7 +113,11 @@ class GA(object):
 
     def evolve(self):
         self.ga.evolve(freq_stats=10)
+        if self.cache is not None:
+            print(self.cache.statistics())
 
     def evalFuncCallback(self, genome):
         genomeString = genome.getInternalList()
+        if self.cache is not None:
+            return self.cache.evaluate(genomeString, self.evalFunc)
         return self.evalFunc(genomeString)
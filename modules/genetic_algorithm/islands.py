@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Islands with route-split genomes. <18/10/2026>
+
+This module runs the GA as an island model: several independent populations, each one evolved
+by the native engine in its own process, exchanging their best individuals every few
+generations.
+
+At each migration every island sends its best individuals to one other island, chosen by the
+topology: the next island (ring) or a random permutation of the islands without fixed points,
+the same in all of them as it comes from a shared seed (random). The migrants replace the worst
+individuals of the island receiving them. The islands report their best individual after each
+generation, so the calling process can follow the global best.
+"""
+import multiprocessing
+import queue
+
+import numpy as np
+
+from modules.genetic_algorithm.array_ga import ArrayGA
+
+
+def migration_targets(islands, topology, seed, epoch):
+    """
+    Island receiving the migrants of each island at a migration.
+    In:
+        islands:Integer = Number of islands.
+        topology:String = "ring" or "random".
+        seed:Integer = Seed shared by the islands.
+        epoch:Integer = Number of the migration.
+    Out:
+        targets:Array = Target of each island.
+    """
+    if topology == "ring":
+        return (np.arange(islands) + 1) % islands
+    if topology == "random":
+        #a random cyclic order of the islands, so no island sends to itself
+        order = np.random.RandomState((seed + epoch) % 2 ** 32).permutation(islands)
+        targets = np.empty(islands, dtype=int)
+        targets[order] = np.roll(order, -1)
+        return targets
+    raise ValueError("Unknown migration topology: " + str(topology))
+
+
+class Island(object):
+    """
+    The step callback of one island: migrates every interval generations and reports the best
+    individual of each generation.
+    """
+    def __init__(self, number, model, inboxes, results):
+        self.number = number
+        self.model = model
+        self.inboxes = inboxes
+        self.results = results
+        self.epoch = 0
+        self.reported = None
+
+    def __call__(self, engine):
+        generation = engine.getCurrentGeneration()
+        model = self.model
+        if generation > 0 and generation % model.interval == 0 and model.islands > 1:
+            self.migrate(engine)
+        best = engine.bestIndividual()
+        genome = best.getInternalList()
+        #the genome only goes to the parent when it changed
+        if self.reported is not None and np.array_equal(self.reported, genome):
+            genome = None
+        else:
+            genome = self.reported = genome.copy()
+        self.results.put(("generation", self.number, generation, best.score, genome))
+        return False
+
+    def migrate(self, engine):
+        model = self.model
+        targets = migration_targets(model.islands, model.topology, model.seed, self.epoch)
+        self.epoch += 1
+        size = min(model.size, engine.population_size)
+        self.inboxes[targets[self.number]].put(engine.population[:size].copy())
+
+        migrants = self.inboxes[self.number].get()
+        rows = np.arange(engine.population_size - len(migrants), engine.population_size)
+        engine.population[rows] = migrants
+        engine.evaluate_rows(rows)
+        engine.sort()
+
+
+def _run_island(number, model, inboxes, results):
+    np.random.seed((model.seed + 7919 * (number + 1)) % 2 ** 32)
+    engine = model.engine_class(model.genes, model.population_size, model.generations,
+                     model.crossover, model.mutation, model.elite, model.evaluator,
+                     Island(number, model, inboxes, results),
+                     batch_evaluator=model.batch_evaluator, flows=model.flows_factory(),
+                     stop_on_convergence=False, seeds=model.seeds, seed_rows=model.seed_rows)
+    best = engine.evolve()
+    results.put(("done", number, engine.getCurrentGeneration(), best.score,
+                 best.getInternalList().copy()))
+
+
+class IslandModel(object):
+    """
+    Island model over the native GA engine, one process per island.
+    In:
+        genes:Array = First argument of the engine: the number of routes of each driver for
+                      ArrayGA, the incidence for RouteSplitGA.
+        islands:Integer = Number of islands.
+        population_size:Integer = Number of individuals of each island.
+        generations, crossover, mutation, elite = As in ArrayGA.
+        evaluator:Function = Score of a genome.
+        interval:Integer = Generations between two migrations.
+        size:Integer = Number of individuals sent by each island at a migration.
+        topology:String = "ring" or "random".
+        batch_evaluator:Function = Scores of several genomes at once.
+        flows_factory:Function = Creates the PopulationFlows of an island (or returns None).
+        engine_class:Class = The native engine of the islands, ArrayGA or RouteSplitGA.
+        seeds, seed_rows = Seeding of the initial population of every island, as in ArrayGA.
+    """
+    def __init__(self, genes, islands, population_size, generations, crossover, mutation,
+                 elite, evaluator, interval=10, size=2, topology="ring", batch_evaluator=None,
+                 flows_factory=None, engine_class=ArrayGA, seeds=None, seed_rows=0):
+        self.genes = genes
+        self.engine_class = engine_class
+        self.seeds = seeds
+        self.seed_rows = seed_rows
+        self.islands = islands
+        self.population_size = population_size
+        self.generations = generations
+        self.crossover = crossover
+        self.mutation = mutation
+        self.elite = elite
+        self.evaluator = evaluator
+        self.interval = max(1, interval)
+        self.size = size
+        self.topology = topology
+        self.batch_evaluator = batch_evaluator
+        self.flows_factory = flows_factory or (lambda: None)
+        self.seed = None
+        migration_targets(islands, topology, 0, 0)
+
+    def evolve(self, callback=None):
+        """
+        Runs the islands until all of them reach the last generation.
+        In:
+            callback:Function = Called with (generation, genome, score) of the global best
+                                individual, once all the islands reached that generation.
+        Out:
+            best:Tuple = Genome and score of the best individual found.
+        """
+        self.seed = int(np.random.randint(0, 2 ** 31))
+        #fork: the islands get the network and the evaluators already loaded
+        context = multiprocessing.get_context("fork")
+        inboxes = [context.Queue() for _ in range(self.islands)]
+        results = context.Queue()
+        processes = [context.Process(target=_run_island, args=(number, self, inboxes, results))
+                     for number in range(self.islands)]
+        for process in processes:
+            process.start()
+
+        genomes = [None] * self.islands
+        pending = {}
+        reported = 0
+        best = (None, np.inf)
+        running = self.islands
+        try:
+            while running:
+                try:
+                    kind, number, generation, score, genome = results.get(timeout=1)
+                except queue.Empty:
+                    if any(process.exitcode not in (None, 0) for process in processes):
+                        raise Exception("Error: an island of the GA stopped unexpectedly.")
+                    continue
+                if genome is not None:
+                    genomes[number] = genome
+                if kind == "done":
+                    running -= 1
+                    if score < best[1]:
+                        best = (genome, score)
+                    continue
+                #global best of the generation, once every island reported it
+                scores = pending.setdefault(generation, [None] * self.islands)
+                scores[number] = (score, genomes[number])
+                while reported in pending and None not in pending[reported]:
+                    score, genome = min(pending.pop(reported), key=lambda item: item[0])
+                    if callback is not None:
+                        callback(reported, genome, score)
+                    reported += 1
+        finally:
+            for process in processes:
+                if running:
+                    process.terminate()
+                process.join()
+        #the last generation, which has no step callback
+        if callback is not None:
+            callback(reported, best[0], best[1])
+        return best
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Route-split populations. <18/10/2026>
+
+This module evaluates the GA population over a pool of worker processes.
+
+The workers are forked after the network is loaded, so the read-only network data (the cost
+engine, the route-edge incidence and the OD pair of each driver) is shared with them by the
+operating system and never copied nor pickled. At each evaluation the population is written in a
+shared memory buffer; the workers only receive row ranges of it and write the scores of those rows
+in a second shared buffer. Each row is evaluated by the same code as the serial evaluation of the
+whole population, so the scores are identical to those of the serial evaluation.
+"""
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+#State of a worker process: the incidence (inherited from the parent) and the attached buffers
+_incidence = None
+_buffers = {}
+
+
+def _init_worker(incidence):
+    global _incidence
+    _incidence = incidence
+
+
+def _attach(name, keep=()):
+    """
+    Shared buffer of the given name, attached once; the buffers not in keep (replaced by the
+    parent) are detached.
+    """
+    for old in [old for old in _buffers if old != name and old not in keep]:
+        _buffers.pop(old).close()
+    if name not in _buffers:
+        _buffers[name] = shared_memory.SharedMemory(name=name)
+    return _buffers[name]
+
+
+def _evaluate_rows(task):
+    """
+    Scores the rows start:stop of the shared population.
+    """
+    population_name, scores_name, shape, dtype, start, stop, counts = task
+    keep = (population_name, scores_name)
+    population = np.ndarray(shape, dtype=dtype, buffer=_attach(population_name, keep).buf)
+    scores = np.ndarray(shape[0], dtype=float, buffer=_attach(scores_name, keep).buf)
+    if counts:
+        scores[start:stop] = _incidence.population_counts_average_travel_times(
+            population[start:stop])
+    else:
+        scores[start:stop] = _incidence.population_average_travel_times(population[start:stop])
+    return stop - start
+
+
+class ParallelEvaluator(object):
+    """
+    Average travel time of each solution of a population, computed by worker processes.
+    In:
+        incidence:RouteIncidence = Incidence of the network.
+        workers:Integer = Number of worker processes.
+        min_rows:Integer = Smallest number of rows per task, smaller populations are evaluated
+                           in the calling process.
+        counts:Boolean = The population has route counts (route-split genomes) instead of the
+                         routes of the drivers.
+    """
+    def __init__(self, incidence, workers, min_rows=2, counts=False):
+        self.incidence = incidence
+        self.counts = counts
+        self.workers = workers
+        self.min_rows = min_rows
+        self.population = None
+        self.scores = None
+        #fork: the workers get the network already loaded, without pickling it; they share the
+        #resource tracker of this process, which frees the buffers if it dies
+        resource_tracker.ensure_running()
+        context = multiprocessing.get_context("fork")
+        self.pool = context.Pool(workers, initializer=_init_worker, initargs=(incidence,))
+
+    def _buffers(self, shape, dtype):
+        """
+        Shared buffers for a population of the given shape, reused while it doesn't change.
+        """
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if self.population is None or self.population.size < size \
+                or self.scores.size < shape[0] * 8:
+            self._release()
+            self.population = shared_memory.SharedMemory(create=True, size=max(1, size))
+            self.scores = shared_memory.SharedMemory(create=True, size=max(8, shape[0] * 8))
+
+    def __call__(self, population):
+        population = np.asarray(population)
+        rows = population.shape[0]
+        if rows < 2 * self.min_rows or self.workers < 2:
+            if self.counts:
+                return self.incidence.population_counts_average_travel_times(population)
+            return self.incidence.population_average_travel_times(population)
+
+        self._buffers(population.shape, population.dtype)
+        shared = np.ndarray(population.shape, dtype=population.dtype, buffer=self.population.buf)
+        shared[:] = population
+        block = max(self.min_rows, -(-rows // self.workers))
+        tasks = [(self.population.name, self.scores.name, population.shape, population.dtype.str,
+                  start, min(start + block, rows), self.counts)
+                 for start in range(0, rows, block)]
+        self.pool.map(_evaluate_rows, tasks)
+        return np.array(np.ndarray(rows, dtype=float, buffer=self.scores.buf))
+
+    def _release(self):
+        for buffer in (self.population, self.scores):
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+        self.population = None
+        self.scores = None
+
+    def close(self):
+        """
+        Stops the workers and frees the shared buffers.
+        """
+        self.pool.close()
+        self.pool.join()
+        self._release()
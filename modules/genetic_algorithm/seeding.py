@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module builds good starting solutions for the GA with classic constructive traffic
+assignment heuristics, restricted to the KSP routes of each OD pair:
+
+    all-or-nothing: every driver takes the cheapest route at the given (free flow) edge costs;
+    incremental loading: the demand is loaded in a few increments, each one all-or-nothing on the
+        costs of the flows loaded so far;
+    method of successive averages (MSA): the route flows move, at each iteration, 1/(i+1) of the
+        way to the all-or-nothing assignment on the current costs.
+
+The solutions are route counts (number of drivers on each route, in the route order of the
+RouteIncidence), the genome of the route-split encoding; split_actions turns them into the
+route of each driver.
+"""
+import numpy as np
+
+
+def cheapest_routes(incidence, route_costs):
+    """
+    Cheapest route of each OD pair (the first one on ties).
+    Out:
+        routes:Array = Cheapest route of each OD pair with routes.
+        ods:Array = Those OD pairs.
+    """
+    order = np.lexsort((np.arange(incidence.num_routes), route_costs, incidence.route_od))
+    starts = incidence.route_offsets[:-1]
+    has_routes = np.diff(incidence.route_offsets) > 0
+    return order[starts[has_routes]], np.flatnonzero(has_routes)
+
+
+def all_or_nothing(incidence, edge_costs, demand=None):
+    """
+    Number of drivers on each route when all the drivers of each OD pair take its cheapest route.
+    In:
+        incidence:RouteIncidence = Incidence of the network.
+        edge_costs:Array = Cost of each edge, in the engine edge order.
+        demand:Array = Drivers of each OD pair (default: all of them).
+    Out:
+        route_counts:Array = Number of drivers on each route.
+    """
+    if demand is None:
+        demand = od_demand(incidence)
+    routes, ods = cheapest_routes(incidence, incidence.route_costs(edge_costs))
+    counts = np.zeros(incidence.num_routes, dtype=np.int64)
+    counts[routes] = demand[ods]
+    return counts
+
+
+def od_demand(incidence):
+    """
+    Number of drivers of each OD pair.
+    """
+    return np.bincount(incidence.driver_od, minlength=incidence.num_ods)
+
+
+def current_costs(incidence, route_counts):
+    """
+    Edge costs with the given number of drivers on each route.
+    """
+    return incidence.cost_engine.evaluate(incidence.link_flows(route_counts))
+
+
+def incremental_loading(incidence, edge_costs, increments=4):
+    """
+    Loads the demand of every OD pair in increments, each one all-or-nothing on the costs of the
+    flows already loaded (the first one on the given edge costs).
+    """
+    demand = od_demand(incidence)
+    counts = np.zeros(incidence.num_routes, dtype=np.int64)
+    for step in range(increments):
+        part = demand * (step + 1) // increments - demand * step // increments
+        if step > 0:
+            edge_costs = current_costs(incidence, counts)
+        counts += all_or_nothing(incidence, edge_costs, part)
+    return counts
+
+
+def round_counts(incidence, route_counts):
+    """
+    Integer route counts keeping the demand of every OD pair: the floor of each count, plus one
+    driver on the routes with the largest fractional parts.
+    """
+    floors = np.floor(route_counts).astype(np.int64)
+    missing = od_demand(incidence) - np.bincount(incidence.route_od, weights=floors,
+                                                  minlength=incidence.num_ods).astype(np.int64)
+    fractions = route_counts - floors
+    order = np.lexsort((-fractions, incidence.route_od))
+    rank = np.empty(incidence.num_routes, dtype=np.int64)
+    rank[order] = np.arange(incidence.num_routes) \
+        - incidence.route_offsets[incidence.route_od[order]]
+    return floors + (rank < missing[incidence.route_od])
+
+
+def successive_averages(incidence, edge_costs, iterations=10):
+    """
+    Method of successive averages from the all-or-nothing assignment on the given edge costs.
+    Out:
+        solutions:List = Integer route counts of every iteration, the last one first.
+    """
+    flows = all_or_nothing(incidence, edge_costs).astype(float)
+    solutions = []
+    for i in range(1, iterations + 1):
+        target = all_or_nothing(incidence, current_costs(incidence, flows))
+        flows += (target - flows) / (i + 1.0)
+        solutions.append(round_counts(incidence, flows))
+    return solutions[::-1]
+
+
+def heuristic_solutions(incidence, free_flow_costs, increments=4, iterations=10):
+    """
+    Distinct solutions of the heuristics, the expected best first: MSA, incremental loading,
+    all-or-nothing and the earlier MSA iterations.
+    In:
+        incidence:RouteIncidence = Incidence of the network.
+        free_flow_costs:Array = Free flow cost of each edge, in the engine edge order.
+    Out:
+        solutions:Array = Route counts, one row per solution.
+    """
+    msa = successive_averages(incidence, free_flow_costs, iterations)
+    candidates = msa[:1] + [incremental_loading(incidence, free_flow_costs, increments),
+                            all_or_nothing(incidence, free_flow_costs)] + msa[1:]
+    solutions = []
+    for candidate in candidates:
+        if not any(np.array_equal(candidate, other) for other in solutions):
+            solutions.append(candidate)
+    return np.array(solutions)
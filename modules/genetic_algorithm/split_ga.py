@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+
+This module has the route-split encoding of the GA: instead of one gene per driver, a genome has
+one gene per route of every OD pair, the number of its drivers taking that route. The drivers of
+an OD pair are interchangeable, so all the permutations of the driver genome leading to the same
+flows are a single split genome, and the genome is as long as the number of routes (at most the
+number of OD pairs times k).
+
+The operators keep the demand of every OD pair: the crossover cuts the genomes between two OD
+pairs, and a mutation moves one driver from its route to a random route of the same OD pair.
+"""
+import numpy as np
+
+from modules.genetic_algorithm.array_ga import ArrayGA
+
+
+def split_actions(incidence, genome):
+    """
+    Route of each driver for a route-split genome: the drivers of each OD pair take its routes
+    in order.
+    """
+    local_routes = np.arange(incidence.num_routes) \
+        - incidence.route_offsets[incidence.route_od]
+    actions = np.empty(incidence.num_drivers, dtype=np.intp)
+    actions[incidence.od_order] = np.repeat(local_routes, np.asarray(genome, dtype=np.intp))
+    return actions
+
+
+class RouteSplitGA(ArrayGA):
+    """
+    Native GA engine over route-split genomes, see ArrayGA for the parameters and the generation
+    loop. The evaluators score route counts (one row per genome).
+    In:
+        incidence:RouteIncidence = Incidence of the network, it defines the route order.
+    """
+    def __init__(self, incidence, population_size, generations, crossover, mutation, elite,
+                 evaluator, step_callback=None, batch_evaluator=None, flows=None, cache=None,
+                 stop_on_convergence=True, seeds=None, seed_rows=0):
+        self.incidence = incidence
+        self.route_offsets = incidence.route_offsets
+        self.route_od = incidence.route_od
+        #Drivers and number of routes of each OD pair
+        self.demand = np.bincount(incidence.driver_od, minlength=incidence.num_ods)
+        self.od_routes = np.diff(incidence.route_offsets)
+        super(RouteSplitGA, self).__init__(self.demand[self.route_od] + 1, population_size,
+                                           generations, crossover, mutation, elite, evaluator,
+                                           step_callback, batch_evaluator, flows, cache,
+                                           stop_on_convergence, seeds, seed_rows)
+        #Cuts between two OD pairs with routes
+        self.cuts = np.unique(self.route_offsets[1:-1])
+        self.cuts = self.cuts[(self.cuts > 0) & (self.cuts < self.num_genes)]
+
+    def random_population(self, rows):
+        """
+        Random splits, the same distribution as every driver choosing a route at random: the
+        drivers left of each OD pair are spread one route at a time.
+        """
+        population = np.zeros((rows, self.num_genes), dtype=self.dtype)
+        left = np.tile(self.demand, (rows, 1))
+        for j in range(int(self.od_routes.max()) if self.od_routes.size else 0):
+            ods = np.flatnonzero(self.od_routes > j)
+            chance = 1.0 / (self.od_routes[ods] - j)
+            counts = np.random.binomial(left[:, ods], chance)
+            population[:, self.route_offsets[ods] + j] = counts
+            left[:, ods] -= counts
+        return population
+
+    def cut_points(self, pairs):
+        if self.cuts.size == 0:
+            return None
+        return self.cuts[np.random.randint(0, self.cuts.size, size=pairs)]
+
+    def perturb(self, genomes, rate):
+        self.mutate(genomes, rate)
+
+    def mutate(self, children, rate=None):
+        """
+        Each driver of each child moves, with probability mutation (or rate), to a random route
+        of its OD pair (possibly the same one).
+        """
+        rate = self.mutation if rate is None else rate
+        total = len(children) * self.incidence.num_drivers
+        mutations = np.random.binomial(total, rate) if rate > 0 else 0
+        if not mutations:
+            return
+        #distinct drivers; as every genome has all the drivers, the position of a driver in the
+        #concatenated genomes gives its genome and route
+        drivers = np.unique(np.random.randint(0, total, size=mutations))
+        ends = np.cumsum(children.ravel(), dtype=np.int64)
+        genes = np.searchsorted(ends, drivers, side='right')
+        rows = genes // self.num_genes
+        sources = genes % self.num_genes
+        ods = self.route_od[sources]
+        targets = self.route_offsets[ods] \
+            + (np.random.random_sample(len(ods)) * self.od_routes[ods]).astype(np.intp)
+        counts = children.astype(np.int64)
+        np.add.at(counts, (rows, sources), -1)
+        np.add.at(counts, (rows, targets), 1)
+        children[:] = counts
+
+    def to_actions(self, genome):
+        """
+        Route of each driver, see split_actions.
+        """
+        return split_actions(self.incidence, genome)
+
+    def from_actions(self, actions):
+        """
+        Number of drivers on each route for the given routes of the drivers.
+        """
+        return self.incidence.route_counts(actions).astype(self.dtype)
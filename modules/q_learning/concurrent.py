@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Runs until the GA stops it, reseeded child, learner state sent back. <18/10/2026>
+
+This module runs the QL episodes in their own process, so the GA<->QL hybrid runs both learners
+at the same time instead of one QL episode inside each GA generation.
+
+The QL process runs its episodes one after the other until the GA stops it. After each one, it
+leaves its solution in a queue holding only the latest solution, which the GA takes when it
+wants it. The GA sends its best individual through a second queue; the QL process runs its next
+episode with those actions (runEpisodeWithAction), as the synchronous hybrid does at the
+exchange generations. When it is stopped, the process sends its learner state (Q-table,
+exploration parameters and rewards) back, so the parent saves and plots it as in the
+synchronous hybrid.
+"""
+import multiprocessing
+import queue
+import random
+
+import numpy as np
+
+#attributes of QL changed by the episodes
+STATE = ("epsilon", "temperature", "episode", "rewards", "traveltimes", "qtable")
+
+
+def _offer(channel, item):
+    """
+    Leaves item in a queue of size one, replacing the item not taken yet.
+    """
+    while True:
+        try:
+            channel.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                channel.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _state(ql):
+    """
+    Learner state of ql, without the memory-mapped Q-table: the parent maps the same file.
+    """
+    state = dict((name, getattr(ql, name)) for name in STATE)
+    if isinstance(ql.qtable, np.memmap):
+        ql.qtable.flush()
+        del state["qtable"]
+    return state
+
+
+def _run_ql(ql, seed, inbox, outbox, result, stop):
+    #the forked process starts with the random state of the parent
+    random.seed(seed)
+    np.random.seed(seed)
+    episode = 0
+    while not stop.is_set():
+        try:
+            actions = inbox.get_nowait()
+        except queue.Empty:
+            actions = None
+        if actions is None:
+            (actions, avg_tt) = ql.runEpisode()
+        else:
+            (actions, avg_tt) = ql.runEpisodeWithAction(actions)
+        _offer(outbox, (episode, actions, avg_tt))
+        episode += 1
+    result.put(_state(ql))
+
+
+class QLProcess(object):
+    """
+    QL learner running its episodes in a child process, until stop is called.
+    In:
+        ql:QL = The learner (the child process gets a copy of it, which is copied back on stop).
+        seed:Integer = Seed of the child process, drawn from np.random when None.
+    """
+    def __init__(self, ql, seed=None):
+        if seed is None:
+            seed = np.random.randint(2**31 - 1)
+        #fork: the learner and the network are inherited, not pickled
+        context = multiprocessing.get_context("fork")
+        self.ql = ql
+        self.inbox = context.Queue()
+        self.outbox = context.Queue(maxsize=1)
+        self.result = context.Queue()
+        self.stop_event = context.Event()
+        self.process = context.Process(target=_run_ql, args=(ql, seed, self.inbox, self.outbox,
+                                                             self.result, self.stop_event))
+
+    def start(self):
+        self.process.start()
+
+    def latest(self):
+        """
+        Solution of the QL episode ended since the last call: (episode, actions, average travel
+        time), or None when no new episode ended.
+        """
+        try:
+            return self.outbox.get_nowait()
+        except queue.Empty:
+            return None
+
+    def send(self, actions):
+        """
+        Sends a solution for QL to learn from in its next episode.
+        """
+        self.inbox.put(actions)
+
+    def stop(self):
+        """
+        Stops the episodes and copies the state of the learner of the process into ql.
+        """
+        self.stop_event.set()
+        #solutions not taken by the process aren't waited for either
+        self.inbox.cancel_join_thread()
+        state = None
+        #the process can't end while a solution is left in its queue, nor before its state is
+        #taken
+        while state is None:
+            self.latest()
+            try:
+                state = self.result.get(timeout=0.1)
+            except queue.Empty:
+                #the state is in the queue before the process ends
+                if not self.process.is_alive() and self.result.empty():
+                    raise Exception("Error: the QL process ended without its learner state.")
+        self.process.join()
+        for name, value in state.items():
+            setattr(self.ql, name, value)
@@ -3,20 +3,27 @@
 Changelog:
     v1.0 - Changelog created. <08/03/2017>
     v1.1 - Corrections in the action selection for the Boltzmann method. <29/03/2017>
+    v1.2 - Q-table stored as a NumPy array, epsilon-greedy vectorized. <18/10/2026>
+    v1.3 - Vectorized and numerically stable Boltzmann action selection. <18/10/2026>
+    v1.4 - Reward history kept as online aggregates, plotting moved out of the episodes. <18/10/2026>
+    v1.5 - Optional memory-mapped Q-table, processed in chunks of drivers. <18/10/2026>
 
 Maintainer: Arthur Zachow Coelho (arthur.zachow@gmail.com)
 
 This module contains the QL class which runs the QL experiments.
 """
-import random
-import math
+import os
 
 import numpy as np
-import matplotlib.pyplot as plt
+
+from modules.experiment.classes import od_indexes
+from modules.q_learning.statistics import RewardHistory
 
 class QL():
     def __init__(self, experiment, drivers, k, decay, alpha, tableFill, epsilon=1, iniTable="zero"
-                 , MINI=0.0, MAX=0.0, fixed=0.0, action_selection="epsilon", temperature=None):
+                 , MINI=0.0, MAX=0.0, fixed=0.0, action_selection="epsilon", temperature=None,
+                 reward_samples=0, reward_sample_interval=1, qtable_file=None,
+                 qtable_load=False, qtable_dtype="float64", chunk_size=None):
         self.experiment = experiment
         self.epsilon = epsilon
         self.alpha = alpha
@@ -24,98 +31,142 @@ class QL():
         self.k = k
         self.action_selection = action_selection
         self.temperature = temperature
-        self.qtable = []
         self.ODtable = {}
         self.drivers = drivers
         self.tableFill = tableFill
         self.numdrivers=len(drivers)
+        #OD pair of each driver, and the number of routes it can take (the OD pair may have
+        #less than k)
+        driver_od, od_list = od_indexes(drivers)
+        self.num_routes = np.array([len(od.paths) for od in od_list], dtype=int)[driver_od]
+        #Q-table: one row per driver, one column per route; in a memory-mapped .npy file when
+        #a file is given, processed in chunks of rows
+        shape = (self.numdrivers, self.k)
+        if chunk_size is None:
+            chunk_size = 65536 if qtable_file else max(1, self.numdrivers)
+        self.chunk_size = chunk_size
+        if qtable_file and qtable_load:
+            print("Loading Q-Table from " + qtable_file + ".")
+            self.qtable = np.load(qtable_file, mmap_mode='r+')
+            if self.qtable.shape != shape:
+                raise ValueError("The Q-Table in %s has shape %s, expected %s."
+                                 % (qtable_file, self.qtable.shape, shape))
+            if self.qtable.dtype != np.dtype(qtable_dtype):
+                raise ValueError("The Q-Table in %s has dtype %s, expected %s."
+                                 % (qtable_file, self.qtable.dtype, np.dtype(qtable_dtype)))
+            iniTable = None
+        elif qtable_file:
+            self.qtable = np.lib.format.open_memmap(qtable_file, mode='w+', dtype=qtable_dtype,
+                                                    shape=shape)
+        else:
+            self.qtable = np.empty(shape, dtype=qtable_dtype)
+
         if iniTable == "coupling":
-            print "Generating Q-Table with mean coupling."
-            for d in drivers:
-                string = []
-                for r in range(len(d.od.paths)):
-                    string.append((-1.0)*(self.tableFill[str(d.od.o)+"|"+str(d.od.d)][r]))
-                self.qtable.append(string)
+            print("Generating Q-Table with mean coupling.")
+            od_values = np.zeros((len(od_list), self.k))
+            for i, od in enumerate(od_list):
+                values = self.tableFill[str(od.origin)+"|"+str(od.destination)][:len(od.paths)]
+                od_values[i, :len(values)] = (-1.0)*np.asarray(values)
+            for rows in self.chunks():
+                self.qtable[rows] = od_values[driver_od[rows]]
         elif iniTable == "random":
-            print "Generating Q-Table with random values."
-            for i in range(self.numdrivers):
-                string = []
-                for t in range(self.k):
-                    string.append(random.uniform(MINI,MAX))
-                self.qtable.append(string)
+            print("Generating Q-Table with random values.")
+            for rows in self.chunks():
+                self.qtable[rows] = np.random.uniform(MINI, MAX, (rows.stop - rows.start, self.k))
         elif iniTable == "fixed":
-            print "Generating Q-Table with fixed values."
-            for i in range(self.numdrivers):
-                self.qtable.append([fixed]*k)
-        #print self.qtable
-        self.all_rewards_values = []
-        self.all_rewards_rounds = []
-        self.all_rewards_colors = []
-        self.color_mapping_od ={}
+            print("Generating Q-Table with fixed values.")
+            for rows in self.chunks():
+                self.qtable[rows] = float(fixed)
+        #routes a driver doesn't have are never chosen
+        for rows in self.chunks():
+            self.qtable[rows][np.arange(self.k) >= self.num_routes[rows, None]] = -np.inf
+        #rewards aggregated per OD pair, plus a bounded sample of them if asked for
+        self.rewards = RewardHistory(driver_od, len(od_list), sample_size=reward_samples,
+                                     sample_interval=reward_sample_interval)
+        #average travel time of each episode
         self.traveltimes = []
         self.episode = 0
+
+    def chunks(self):
+        """
+        Slices of chunk_size rows covering the Q-table.
+        """
+        for start in range(0, self.numdrivers, self.chunk_size):
+            yield slice(start, min(start + self.chunk_size, self.numdrivers))
+
+    def select_epsilon(self):
+        """
+        Epsilon-greedy selection for all the drivers at once: with probability epsilon a random
+        route, otherwise one of the routes with the highest Q-value (ties broken at random).
+        """
+        explore = np.random.random_sample(self.numdrivers) < self.epsilon
+        actions = (np.random.random_sample(self.numdrivers) * self.num_routes).astype(int)
+        for rows in self.chunks():
+            greedy = np.flatnonzero(~explore[rows])
+            if greedy.size:
+                table = self.qtable[rows][greedy]
+                ties = table == table.max(axis=1)[:, None]
+                #a random key for each route with the maximum value, the largest one wins
+                actions[rows.start + greedy] = np.argmax(np.random.random_sample(table.shape)
+                                                         + ties, axis=1)
+        return actions
+
+    def select_boltzmann(self):
+        """
+        Boltzmann selection for all the drivers at once, i.e. a route with probability
+        proportional to exp(Q/temperature). The routes are sampled with the Gumbel-max trick on
+        the Q-values shifted by their maximum, so large negative Q-values don't overflow and a
+        temperature close to zero turns into greedy selection (ties broken at random).
+        """
+        actions = np.zeros(self.numdrivers, dtype=int)
+        for rows in self.chunks():
+            table = np.asarray(self.qtable[rows], dtype=float)
+            maxes = table.max(axis=1)[:, None]
+            noise = np.random.gumbel(size=table.shape)
+            if self.temperature > 0:
+                with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+                    logits = (table - maxes) / self.temperature
+                #routes the driver doesn't have stay out, and so do the overflown ones
+                logits[~np.isfinite(logits)] = -np.inf
+            else:
+                logits = np.where(table == maxes, 0.0, -np.inf)
+            actions[rows] = np.argmax(logits + noise, axis=1)
+        return actions
+
+    def update_table(self, actions, traveltimes):
+        """
+        Updates the Q-value of the action of every driver. The reward is the negative of the
+        travel time.
+        """
+        rewards = -np.asarray(traveltimes, dtype=float)
+        for rows in self.chunks():
+            table = self.qtable[rows]
+            drivers = np.arange(rows.stop - rows.start)
+            table[drivers, actions[rows]] = table[drivers, actions[rows]] * (1-self.alpha) \
+                + self.alpha*rewards[rows]
+        return rewards
+
+    def save_table(self):
+        """
+        Writes the memory-mapped Q-table to its file, so a later run can load it.
+        """
+        if isinstance(self.qtable, np.memmap):
+            self.qtable.flush()
+
     ##runs one episode of ql
     ##returns (instance,averagefitnessvalue)
     ##list of routes (one for each driver)
     def runEpisode(self):
-        actions=[]
-        #for each driver, select its list of actions in qtable
-        for a in self.qtable:
-            if self.action_selection == "epsilon":
-                #selection according to epsilon-greedy
-                randomnb = random.uniform(0, 1)
-                if randomnb < self.epsilon:
-                    # action is selected randomly
-                    curaction = random.randint(0, self.k-1)
-                else:
-                    # action is selected greedly
-                    max_in_array = max(a)
-                    #print max_in_array
-                    array_of_pointers2max = []
-                    for na in range(len(a)): #for each action
-                        if a[na] == max_in_array:
-                            array_of_pointers2max.append(na)
-
-                    #Chooses one of the actions with maximum value
-                    curaction = random.choice(array_of_pointers2max)
-
-            elif self.action_selection == "boltzmann":
-                #Updates the probability of each action
-                list_tup = []
-                total = 0.0
-                index = 0
-                for action in a:
-                    total += math.exp(action/self.temperature)
-                for action in a:
-                    list_tup.append((index, math.exp(action/self.temperature)/total))
-                    index += 1
-
-                #Selects the action
-                random_number = random.uniform(0, 1)
-                total = 0.0
-                index = 0
-
-                list_tup = sorted(list_tup, key=lambda prob: prob[1])
-
-                while total < random_number:
-                    total += list_tup[index][1]
-                    if random_number <= total:
-                        curaction = list_tup[index][0]
-                        break
-                    index += 1
-
-            actions.append(curaction)
+        if self.action_selection == "epsilon":
+            actions = self.select_epsilon()
+        elif self.action_selection == "boltzmann":
+            actions = self.select_boltzmann()
 
         traveltimes = self.experiment.calculateIndividualTravelTime(actions)
         self.episode += 1
         #updates qtable. reward is the negative of the travel time
-        for drIndex in range(self.numdrivers):
-            reward = -traveltimes[drIndex]
-            #print 'reward: '+str(reward)+"\n"
-            self.qtable[drIndex][actions[drIndex]] = self.qtable[drIndex][actions[drIndex]] * (1-self.alpha) + self.alpha*reward
-            self.all_rewards_values.append(reward)
-            self.all_rewards_rounds.append(self.episode)
-            self.all_rewards_colors.append(self.color_od(self.drivers[drIndex]))
+        rewards = self.update_table(actions, traveltimes)
+        self.rewards.add(self.episode, rewards)
 
         if self.action_selection == "epsilon":
             #updates epsilon
@@ -124,23 +175,16 @@ class QL():
         if self.action_selection == "boltzmann":
             self.temperature = self.temperature * self.decay
 
-        average_tt_time = sum(traveltimes)/self.numdrivers
-        if(self.episode == 100):
-            plt.figure(1)
-            plt.scatter(self.all_rewards_rounds, self.all_rewards_values, c= self.all_rewards_colors)
-            plt.figure(2)
-            plt.plot(self.traveltimes)
-            plt.show()
+        average_tt_time = float(np.sum(traveltimes))/self.numdrivers
+        self.traveltimes.append(average_tt_time)
         return (actions, average_tt_time)
 
     def runEpisodeWithAction(self, actions):
+        actions = np.asarray(actions, dtype=int)
         traveltimes = self.experiment.calculateIndividualTravelTime(actions)
 
         #updates qtable. reward is the negative of the travel time
-        for drIndex in range(self.numdrivers):
-            reward = -traveltimes[drIndex]
-            #print 'reward: '+str(reward)+"\n"
-            self.qtable[drIndex][actions[drIndex]] = self.qtable[drIndex][actions[drIndex]] * (1-self.alpha) + self.alpha*reward
+        self.update_table(actions, traveltimes)
 
         if self.action_selection == "epsilon":
             #updates epsilon
@@ -149,13 +193,33 @@ class QL():
         if self.action_selection == "boltzmann":
             self.temperature = self.temperature * self.decay
 
-        average_tt_time = sum(traveltimes)/self.numdrivers
+        average_tt_time = float(np.sum(traveltimes))/self.numdrivers
         return (actions, average_tt_time)
-    def color_od(self,driver):
-        origin = driver.od.o
-        destination = driver.od.d
-        if(origin not in self.color_mapping_od.keys()):
-            self.color_mapping_od[origin] = {}
-        if(destination not in self.color_mapping_od[origin].keys()):
-            self.color_mapping_od[origin][destination] = np.random.rand()
-        return self.color_mapping_od[origin][destination]
+
+    def plot_rewards(self, filename=None):
+        """
+        Plots the sampled rewards (colored by OD pair) and the average travel time of each
+        episode, after the run. Shows the figures, or saves them when a filename is given.
+        """
+        import matplotlib
+        if filename is not None:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        episodes, ods, rewards = self.rewards.sampled()
+        plt.figure(1)
+        plt.scatter(episodes, rewards, c=ods, cmap="tab20")
+        plt.xlabel("Episode")
+        plt.ylabel("Reward")
+        plt.figure(2)
+        plt.plot(self.traveltimes)
+        plt.xlabel("Episode")
+        plt.ylabel("Average travel time")
+        if filename is None:
+            plt.show()
+        else:
+            root, ext = os.path.splitext(filename)
+            plt.figure(1)
+            plt.savefig(root + "_rewards" + (ext or ".png"))
+            plt.figure(2)
+            plt.savefig(root + "_traveltimes" + (ext or ".png"))
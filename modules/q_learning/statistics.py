@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Changelog:
+    v1.0 - Created. <18/10/2026>
+    v1.1 - Sampled drivers drawn in O(samples) instead of a permutation of all. <18/10/2026>
+
+This module keeps the history of the rewards of the QL drivers in bounded memory: running
+aggregates per OD pair and, optionally, a down-sampled ring buffer of individual rewards.
+"""
+import random
+
+import numpy as np
+
+
+class RewardHistory(object):
+    """
+    Online statistics of the rewards, per OD pair: count, mean, variance, min and max.
+    In:
+        driver_od:Array = OD pair index of each driver.
+        num_ods:Integer = Number of OD pairs.
+        sample_size:Integer = Capacity of the ring buffer of sampled rewards (0 disables it).
+        sample_interval:Integer = Episodes between two samplings.
+        sample_drivers:Integer = Drivers sampled at each sampling.
+    """
+    def __init__(self, driver_od, num_ods, sample_size=0, sample_interval=1, sample_drivers=100):
+        self.driver_od = np.asarray(driver_od, dtype=np.intp)
+        self.num_ods = num_ods
+        self.count = np.zeros(num_ods, dtype=np.int64)
+        self.mean = np.zeros(num_ods)
+        self.m2 = np.zeros(num_ods)
+        self.min = np.full(num_ods, np.inf)
+        self.max = np.full(num_ods, -np.inf)
+
+        self.sample_size = sample_size
+        self.sample_interval = max(1, sample_interval)
+        self.sample_drivers = min(sample_drivers, len(self.driver_od), sample_size)
+        self.sample_episodes = np.zeros(sample_size, dtype=np.int64)
+        self.sample_ods = np.zeros(sample_size, dtype=np.intp)
+        self.sample_rewards = np.zeros(sample_size)
+        self.samples = 0
+
+    def add(self, episode, rewards):
+        """
+        Adds the rewards of an episode (one per driver).
+        """
+        rewards = np.asarray(rewards, dtype=float)
+        count = np.bincount(self.driver_od, minlength=self.num_ods)
+        present = count > 0
+        mean = np.zeros(self.num_ods)
+        mean[present] = np.bincount(self.driver_od, weights=rewards,
+                                    minlength=self.num_ods)[present] / count[present]
+        m2 = np.bincount(self.driver_od, weights=(rewards - mean[self.driver_od]) ** 2,
+                         minlength=self.num_ods)
+
+        #Merges the episode aggregates into the running ones (Chan et al.)
+        total = self.count + count
+        delta = mean - self.mean
+        ratio = np.zeros(self.num_ods)
+        ratio[present] = count[present] / total[present].astype(float)
+        self.mean += delta * ratio
+        self.m2 += m2 + delta ** 2 * self.count * ratio
+        self.count = total
+        np.minimum.at(self.min, self.driver_od, rewards)
+        np.maximum.at(self.max, self.driver_od, rewards)
+
+        if self.sample_size and episode % self.sample_interval == 0 and self.sample_drivers:
+            #without a permutation of all the drivers (O(drivers) at every sampling)
+            drivers = np.array(random.sample(range(len(rewards)), self.sample_drivers),
+                               dtype=np.intp)
+            slots = (self.samples + np.arange(self.sample_drivers)) % self.sample_size
+            self.sample_episodes[slots] = episode
+            self.sample_ods[slots] = self.driver_od[drivers]
+            self.sample_rewards[slots] = rewards[drivers]
+            self.samples += self.sample_drivers
+
+    def variance(self):
+        """
+        Variance of the rewards of each OD pair.
+        """
+        variance = np.zeros(self.num_ods)
+        present = self.count > 0
+        variance[present] = self.m2[present] / self.count[present]
+        return variance
+
+    def sampled(self):
+        """
+        Rewards kept in the ring buffer, oldest first.
+        Out:
+            episodes:Array = Episode of each sampled reward.
+            ods:Array = OD pair index of each sampled reward.
+            rewards:Array = Sampled rewards.
+        """
+        size = min(self.samples, self.sample_size)
+        order = (self.samples - size + np.arange(size)) % max(1, self.sample_size)
+        return self.sample_episodes[order], self.sample_ods[order], self.sample_rewards[order]
@@ -2,13 +2,27 @@
 """
 Changelog:
     v1.0 - Changelog created. <08/03/2017>
+    v1.1 - Parallel parameter sweep (--jobs) and per-task seeds. <18/10/2026>
+    v1.2 - Route cache (--route-cache). <18/10/2026>
+    v1.3 - Parallel KSP (--ksp-workers). <18/10/2026>
+    v1.4 - Routes of an origin computed together (--ksp-method). <18/10/2026>
+    v1.5 - Network bundles (compile_network.py) accepted by -f. <18/10/2026>
+    v1.6 - Startup times printed with --verbose. <18/10/2026>
 
 Author: Arthur Zachow Coelho (arthur.zachow@gmail.com)
 
 This module takes care of handling arguments from the command line.
 """
 import argparse
+import multiprocessing
+import os
+import queue
+import random
+import time
 from os.path import basename, splitext
+
+import numpy as np
+
 import modules.experiment.experiment as exp
 
 
@@ -25,7 +39,18 @@ def run_type(ARGS):
                         p_drivers_link=P_DRIVERS_LINK, p_od_pair=P_OD_PAIR, epsilon=epsilon,
                         p_interval=P_INTERVAL, p_drivers_route=P_DRIVERS_ROUTE,
                         TABLE_INITIAL_STATE=QL_TABLE_STATE, MAXI=MAXI, MINI=MINI, fixed=FIXED,
-                        action_selection=ACTION_SELECTION, temperature=TEMPERATURE)
+                        action_selection=ACTION_SELECTION, temperature=TEMPERATURE,
+                        cost_table=COST_TABLE, cost_table_memory=COST_TABLE_MEMORY,
+                        reward_samples=REWARD_SAMPLES,
+                        reward_sample_interval=REWARD_SAMPLE_INTERVAL, plot_rewards=PLOT_REWARDS,
+                        qtable_file=QTABLE_FILE, qtable_load=QTABLE_LOAD, qtable_dtype=QTABLE_DTYPE,
+                        chunk_size=CHUNK_SIZE, ga_engine=GA_ENGINE, ga_delta=GA_DELTA,
+                        fitness_cache=FITNESS_CACHE, workers=WORKERS, islands=ISLANDS,
+                        migration_interval=MIGRATION_INTERVAL, migration_size=MIGRATION_SIZE,
+                        migration_topology=MIGRATION_TOPOLOGY, ga_encoding=GA_ENCODING,
+                        ga_seeding=GA_SEEDING, concurrent_hybrid=CONCURRENT_HYBRID,
+                        route_cache=ROUTE_CACHE, ksp_workers=KSP_WORKERS,
+                        ksp_method=KSP_METHOD, verbose=VERBOSE)
 
     if EXPERIMENT_TYPE == 1:  # QL only
         print("Parameters:\n\tAction sel.: {0}\tGenerations: {1}".format(ACTION_SELECTION, GENERATIONS)
@@ -79,15 +104,90 @@ def process_args(ARGS):
     return args
 
 
+def task_seed(base_seed, config, repetition):
+    """
+    Seed of one repetition of one configuration, derived from the base seed only, so a task gets
+    the same seed whatever the number of jobs and the order the tasks run in.
+    """
+    return int(np.random.SeedSequence([base_seed, config, repetition]).generate_state(1)[0])
+
+
+def run_task(task):
+    """
+    Runs one repetition of one configuration, seeding the random generators with its seed.
+    task: (number, total, configuration, arguments, repetition, seed)
+    """
+    number, total, config, arg, repetition, seed = task
+    random.seed(seed)
+    np.random.seed(seed)
+    start = time.time()
+    print("[worker %d] Task %d/%d started: configuration %d, repetition %d/%d, seed %d"
+          % (os.getpid(), number + 1, total, config + 1, repetition + 1, REPETITIONS, seed))
+    run_type(arg)
+    print("[worker %d] Task %d/%d finished in %.1fs"
+          % (os.getpid(), number + 1, total, time.time() - start))
+
+
+def _run_worker(tasks, done):
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        run_task(task)
+        done.put(task[0])
+
+
 def run_arg(args):
     """
     args: list of arguments
+
+    Every repetition of every configuration is a task; with JOBS > 1 the tasks are run by a pool
+    of worker processes.
     """
-    for arg in args:
+    tasks = []
+    for config, arg in enumerate(args):
         assert len(arg) == 8
         for repetition in range(REPETITIONS):
-            run_type(arg)
-            print("Repetition %s/%s\n" % (repetition + 1, REPETITIONS))
+            tasks.append((config, arg, repetition, task_seed(SEED, config, repetition)))
+    total = len(tasks)
+    tasks = [(number, total) + task for number, task in enumerate(tasks)]
+
+    if JOBS <= 1 or total <= 1:
+        for task in tasks:
+            run_task(task)
+            print("Repetition %s/%s\n" % (task[4] + 1, REPETITIONS))
+        return
+
+    #fork: the workers get the parsed arguments; they aren't daemons, so a task can still start
+    #its own processes (GA workers, islands, concurrent QL)
+    context = multiprocessing.get_context("fork")
+    pending = context.Queue()
+    done = context.Queue()
+    for task in tasks:
+        pending.put(task)
+    workers = [context.Process(target=_run_worker, args=(pending, done))
+               for _ in range(min(JOBS, total))]
+    for _ in workers:
+        pending.put(None)
+    for worker in workers:
+        worker.start()
+
+    completed = 0
+    try:
+        while completed < total:
+            try:
+                done.get(timeout=1)
+            except queue.Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    raise Exception("Error: a worker of the parameter sweep stopped unexpectedly.")
+                continue
+            completed += 1
+            print("Completed %d/%d tasks\n" % (completed, total))
+    finally:
+        for worker in workers:
+            if completed < total:
+                worker.terminate()
+            worker.join()
 
 
 def run(ARGS):
@@ -109,7 +209,9 @@ def build_parser():
                                   Script to run the simulation of
                                   drivers going from different points in a given network""")
 
-    prs.add_argument("-f", dest="file", required=True, help="The network file.\n")
+    prs.add_argument("-f", dest="file", required=True,
+                     help="The network file, or a network bundle (.npz) made by compile_network.py"
+                          + " with the same k and base flow.\n")
 
     prs.add_argument("-as", "--action-selection", type=str, choices=["epsilon", "boltzmann"],
                      default="epsilon", help="How the agents should select their actions.\n")
@@ -201,6 +303,109 @@ def build_parser():
     prs.add_argument("-t", "--temperature", type=float, help="Temperature for the" \
                                                              " Boltzmann action selection.\n")
 
+    prs.add_argument("--cost-table", action="store_true", default=False,
+                     help="Tabulate the cost of each link for every reachable flow at startup, so"
+                          + " the costs are looked up instead of evaluated.\n")
+
+    prs.add_argument("--cost-table-memory", type=float, default=256,
+                     help="Memory budget of the cost tables, in MB; links beyond it keep evaluating"
+                          + " their cost function.\n")
+
+    prs.add_argument("--reward-samples", type=int, default=0,
+                     help="How many individual QL rewards are kept (in a ring buffer) to be plotted;"
+                          + " aggregates per OD pair are always kept.\n")
+
+    prs.add_argument("--reward-sample-interval", type=int, default=1,
+                     help="Interval of episodes by which QL rewards are sampled.\n")
+
+    prs.add_argument("--plot-rewards", action="store_true", default=False,
+                     help="Plot the sampled QL rewards and the average travel time after the run.\n")
+
+    prs.add_argument("--qtable-file", type=str, default=None,
+                     help="Memory-map the Q-table in this .npy file, which keeps the learned policy"
+                          + " after the run.\n")
+
+    prs.add_argument("--qtable-load", action="store_true", default=False,
+                     help="Start from the Q-table saved in the --qtable-file instead of initiating it.\n")
+
+    prs.add_argument("--qtable-dtype", type=str, choices=["float32", "float64"], default="float64",
+                     help="Float type of the Q-table values.\n")
+
+    prs.add_argument("--chunk-size", type=int, default=None,
+                     help="Number of drivers QL processes at once (default: all of them, or 65536"
+                          + " with a --qtable-file).\n")
+
+    prs.add_argument("--ga-engine", type=str, choices=["pyevolve", "native"], default="pyevolve",
+                     help="GA implementation: pyevolve genomes or the native engine, which keeps"
+                          + " the population in one NumPy matrix.\n")
+
+    prs.add_argument("--ga-delta", action="store_true", default=False,
+                     help="With the native GA engine, score each child from the link flows of its"
+                          + " parent and the genes crossover and mutation changed, instead of the"
+                          + " whole population at once (with the fitness cache). Pays off on large"
+                          + " networks with a low mutation rate.\n")
+
+    prs.add_argument("--fitness-cache", type=int, default=1024,
+                     help="Number of GA genomes whose score is cached, so identical genomes are"
+                          + " evaluated once (0 disables the cache).\n")
+
+    prs.add_argument("--workers", type=int, default=1,
+                     help="Number of processes evaluating the GA population with the native engine"
+                          + " (it replaces the evaluation of the children from their parents).\n")
+
+    prs.add_argument("--islands", type=int, default=1,
+                     help="Number of GA populations (islands), each one evolved by the native engine"
+                          + " in its own process (GA only).\n")
+
+    prs.add_argument("--migration-interval", type=int, default=10,
+                     help="Generations between two migrations of the islands.\n")
+
+    prs.add_argument("--migration-size", type=int, default=2,
+                     help="Number of best individuals each island sends at a migration.\n")
+
+    prs.add_argument("--migration-topology", type=str, choices=["ring", "random"], default="ring",
+                     help="Island receiving the migrants: the next one or a random one.\n")
+
+    prs.add_argument("--ga-encoding", type=str, choices=["driver", "split"], default="driver",
+                     help="GA genome: the route of each driver, or the number of drivers on each"
+                          + " route of each OD pair (native engine, keeps the OD demands).\n")
+
+    prs.add_argument("--ga-seeding", type=float, default=0.0,
+                     help="Fraction of the initial GA population seeded with all-or-nothing,"
+                          + " incremental loading and MSA solutions on the free flow costs (native"
+                          + " engine).\n")
+
+    prs.add_argument("--concurrent-hybrid", action="store_true", default=False,
+                     help="In experiment types 3 and 4, run the QL episodes in their own process at"
+                          + " the same time as the GA, exchanging solutions through queues.\n")
+
+    prs.add_argument("-j", "--jobs", type=int, default=1,
+                     help="Number of processes running the configurations and repetitions at the"
+                          + " same time (don't share a --qtable-file between them).\n")
+
+    prs.add_argument("--seed", type=int, default=None,
+                     help="Base seed of the run; each repetition of each configuration gets its own"
+                          + " seed derived from it (default: a random one, printed at startup).\n")
+
+    prs.add_argument("--route-cache", type=str, default=None,
+                     help="Folder where the k shortest routes of each network, k and base flow are"
+                          + " kept between runs, e.g. ./results_gaql_grouped/routes (default: none,"
+                          + " they are computed every time).\n")
+
+    prs.add_argument("--ksp-workers", type=int, default=1,
+                     help="Number of processes computing the k shortest routes, one origin at a"
+                          + " time.\n")
+
+    prs.add_argument("--ksp-method", type=str, choices=["ksp", "batched"], default="ksp",
+                     help="How the k shortest routes are computed: getKRoutes for each OD pair"
+                          + " (the reference), or one shortest path tree shared by all the OD pairs"
+                          + " of an origin. \"batched\" picks other routes among those of the same"
+                          + " cost, so it gives other route sets (the drivers' actions) and other"
+                          + " results than \"ksp\"; it needs unique edge names.\n")
+
+    prs.add_argument("--verbose", action="store_true", default=False,
+                     help="Print the time spent in each stage of the experiment startup.\n")
+
     args = prs.parse_args()
 
     return args
@@ -241,5 +446,34 @@ if __name__ == "__main__":
     TABLE_FILL_FILE = args.table_fill_file
     TEMPERATURE = args.temperature
     ACTION_SELECTION = args.action_selection
+    COST_TABLE = args.cost_table
+    COST_TABLE_MEMORY = args.cost_table_memory
+    REWARD_SAMPLES = args.reward_samples
+    REWARD_SAMPLE_INTERVAL = args.reward_sample_interval
+    PLOT_REWARDS = args.plot_rewards
+    QTABLE_FILE = args.qtable_file
+    QTABLE_LOAD = args.qtable_load
+    QTABLE_DTYPE = args.qtable_dtype
+    CHUNK_SIZE = args.chunk_size
+    GA_ENGINE = args.ga_engine
+    GA_DELTA = args.ga_delta
+    FITNESS_CACHE = args.fitness_cache
+    WORKERS = args.workers
+    ISLANDS = args.islands
+    MIGRATION_INTERVAL = args.migration_interval
+    MIGRATION_SIZE = args.migration_size
+    MIGRATION_TOPOLOGY = args.migration_topology
+    GA_ENCODING = args.ga_encoding
+    GA_SEEDING = args.ga_seeding
+    CONCURRENT_HYBRID = args.concurrent_hybrid
+    ROUTE_CACHE = args.route_cache
+    KSP_WORKERS = args.ksp_workers
+    KSP_METHOD = args.ksp_method
+    VERBOSE = args.verbose
+    JOBS = args.jobs
+    SEED = args.seed
+    if SEED is None:
+        SEED = random.SystemRandom().randrange(2 ** 32)
+    print("Base seed: %d" % SEED)
 
     run(args)
@@ -0,0 +1,91 @@
+"""
+Shared fixtures of the tests: small networks written to temporary files, and the experiments
+built on them.
+
+Most modules read the network through the ksp submodule; the tests needing it are skipped when
+it isn't checked out.
+"""
+import os
+import random
+import sys
+
+import pytest
+from py_expression_eval import Parser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+
+def write_grid(path, size=4, ods=6, seed=0, decimals=6):
+    """
+    Writes a size x size grid network (BPR costs, undirected edges) with random OD pairs.
+    In:
+        decimals:Integer = Decimals of the free flow times; with many, no two routes have the
+                           same cost.
+    Out:
+        path:String = The network file.
+    """
+    rng = random.Random(seed)
+    lines = ["function BPR (f) t*(1+0.15*(f/c)^4)"]
+    for i in range(size):
+        for j in range(size):
+            lines.append("node %d_%d" % (i, j))
+    for i in range(size):
+        for j in range(size):
+            if i + 1 < size:
+                lines.append("edge e%d_%d_d %d_%d %d_%d BPR %s 50" % (
+                    i, j, i, j, i + 1, j, round(rng.uniform(1, 9), decimals)))
+            if j + 1 < size:
+                lines.append("edge e%d_%d_r %d_%d %d_%d BPR %s 50" % (
+                    i, j, i, j, i, j + 1, round(rng.uniform(1, 9), decimals)))
+    pairs = set()
+    while len(pairs) < ods:
+        origin = (rng.randrange(size), rng.randrange(size))
+        destination = (rng.randrange(size), rng.randrange(size))
+        if origin != destination and (origin, destination) not in pairs:
+            pairs.add((origin, destination))
+            lines.append("od %d_%d|%d_%d %d_%d %d_%d %d" % (origin + destination + origin
+                                                            + destination
+                                                            + (2 * rng.randint(5, 30),)))
+    with open(str(path), 'w') as net_file:
+        net_file.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def ksp():
+    return pytest.importorskip("ksp.KSP")
+
+
+@pytest.fixture
+def grid_file(tmp_path):
+    return write_grid(tmp_path / "grid.net")
+
+
+@pytest.fixture
+def experiment(ksp, grid_file):
+    from modules.experiment.experiment import Experiment
+    return Experiment(3, grid_file, 1)
+
+
+def naive_travel_times(experiment, actions):
+    """
+    Travel time of each driver, computed the way the original code did: the flow of each edge
+    summed driver by driver, and its cost evaluated by py_expression_eval from its formula.
+    """
+    incidence = experiment.incidence
+    functions = dict((edge.name, edge.function) for edge in experiment.Eo)
+    flows = dict((name, 0.0) for name in functions)
+    routes = []
+    for od, action in zip(incidence.driver_od, actions):
+        route = experiment.ODlist[od].paths[action][0]
+        routes.append(route)
+        for edge in route:
+            flows[edge] += experiment.group_size
+    costs = dict((name, Parser().parse(functions[name]).evaluate({'f': flows[name]}))
+                 for name in functions)
+    return [sum(costs[edge] for edge in route) for route in routes]
+
+
+@pytest.fixture
+def naive():
+    return naive_travel_times
@@ -0,0 +1,42 @@
+"""
+The experiments started from a network bundle against the ones started from the network file.
+"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def bundle_file(ksp, grid_file, tmp_path):
+    from modules.experiment.bundle import compile_network
+    return compile_network(grid_file, 3, output=str(tmp_path / "grid.npz"))
+
+
+def test_bundle_matches_network_file(experiment, bundle_file):
+    from modules.experiment.bundle import is_bundle
+    from modules.experiment.experiment import Experiment
+    assert is_bundle(bundle_file)
+    compiled = Experiment(3, bundle_file, 1)
+    assert [edge.name for edge in compiled.Eo] == [edge.name for edge in experiment.Eo]
+    assert [edge.function for edge in compiled.Eo] == [edge.function for edge in experiment.Eo]
+    assert [(str(od.origin), str(od.destination), od.num_travels) for od in compiled.ODlist] \
+        == [(str(od.origin), str(od.destination), od.num_travels) for od in experiment.ODlist]
+    for od_compiled, od_expected in zip(compiled.ODlist, experiment.ODlist):
+        assert [list(path[0]) for path in od_compiled.paths] \
+            == [list(path[0]) for path in od_expected.paths]
+        np.testing.assert_allclose([path[1] for path in od_compiled.paths],
+                                   [path[1] for path in od_expected.paths], rtol=1e-12)
+
+    incidence = experiment.incidence
+    np.testing.assert_array_equal(compiled.incidence.driver_num_routes,
+                                  incidence.driver_num_routes)
+    rng = np.random.RandomState(16)
+    population = (rng.random_sample((5, incidence.num_drivers))
+                  * incidence.driver_num_routes).astype(int)
+    np.testing.assert_array_equal(compiled.incidence.population_average_travel_times(population),
+                                  incidence.population_average_travel_times(population))
+
+
+def test_bundle_checks_k_and_flow(bundle_file):
+    from modules.experiment.experiment import Experiment
+    with pytest.raises(Exception, match="k=3"):
+        Experiment(4, bundle_file, 1)
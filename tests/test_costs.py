@@ -0,0 +1,48 @@
+"""
+The vectorized cost engine against the cost function of each edge.
+"""
+import numpy as np
+
+NEGATIVE = """function BPR (f) t*(1+0.15*(f/c)^4)
+function LIN (f) a+b*f
+node A
+node B
+node C
+dedge AB A B BPR 2 100
+dedge BC B C BPR 3 -50
+dedge AC A C LIN 5 -0.01
+od A|C A C 10
+"""
+
+
+def edge_costs(edges, flows):
+    return np.array([edge.eval_cost(flow) for edge, flow in zip(edges, flows)])
+
+
+def test_engine_matches_eval_cost(ksp, grid_file):
+    from modules.experiment.costs import CostEngine
+    import modules.functions.functions as utils
+    _, edges, _ = utils.read_infos(grid_file, flow=0)
+    engine = CostEngine(edges)
+    flows = np.random.RandomState(0).randint(0, 200, size=(3, engine.num_edges)).astype(float)
+    for row in flows:
+        np.testing.assert_allclose(engine.evaluate(row), edge_costs(engine.edges, row),
+                                   rtol=1e-12)
+    np.testing.assert_allclose(engine.evaluate(flows),
+                               [edge_costs(engine.edges, row) for row in flows], rtol=1e-12)
+    some = np.array([3, 0, 3, 1])
+    np.testing.assert_allclose(engine.evaluate(flows[0, :4], some),
+                               [engine.edges[i].eval_cost(flow)
+                                for i, flow in zip(some, flows[0, :4])], rtol=1e-12)
+
+
+def test_negative_constants_match_eval_cost(ksp, tmp_path):
+    from modules.experiment.costs import CostEngine
+    import modules.functions.functions as utils
+    path = tmp_path / "negative.net"
+    path.write_text(NEGATIVE)
+    _, edges, _ = utils.read_infos(str(path), flow=0)
+    engine = CostEngine(edges)
+    flows = np.array([7.0, 30.0, 120.0])
+    np.testing.assert_allclose(engine.evaluate(flows), edge_costs(engine.edges, flows),
+                               rtol=1e-12)
@@ -0,0 +1,48 @@
+"""
+The GA children scored from the flows of their parents against a full evaluation.
+"""
+import numpy as np
+import pytest
+
+
+def test_derive_matches_full_evaluation(experiment):
+    from modules.experiment.incidence import PopulationFlows
+    incidence = experiment.incidence
+    rng = np.random.RandomState(4)
+    parents = (rng.random_sample((4, incidence.num_drivers))
+               * incidence.driver_num_routes).astype(int)
+    flows = PopulationFlows(incidence)
+    flows.evaluate(parents)
+    bases = np.array([0, 0, 2, 3, 1])
+    children = parents[bases]
+    changes = []
+    for child in children:
+        #the last driver is listed as changed but keeps its route
+        drivers = rng.choice(incidence.num_drivers, 3, replace=False)
+        child[drivers[:2]] = (rng.random_sample(2) * incidence.driver_num_routes[drivers[:2]])
+        changes.append(drivers)
+    expected = incidence.population_average_travel_times(children)
+    for given in (changes, None):
+        derived = flows.derive(children, bases, given)
+        np.testing.assert_allclose(derived.averages(), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("mutation", [0.01, 0.3])
+def test_delta_ga_scores_match_full_evaluation(experiment, mutation):
+    from modules.experiment.incidence import PopulationFlows
+    from modules.genetic_algorithm.array_ga import ArrayGA
+    incidence = experiment.incidence
+    checked = []
+
+    def check(engine):
+        full = incidence.population_average_travel_times(engine.population)
+        np.testing.assert_allclose(engine.scores, full, rtol=1e-12)
+        checked.append(engine.current_generation)
+        return False
+
+    np.random.seed(5)
+    engine = ArrayGA(incidence.driver_num_routes, 10, 15, 0.8, mutation, 2, None, check,
+                     batch_evaluator=incidence.population_average_travel_times,
+                     flows=PopulationFlows(incidence), stop_on_convergence=False)
+    engine.evolve()
+    assert len(checked) >= 15
@@ -0,0 +1,50 @@
+"""
+The compiled cost formulas against py_expression_eval's own evaluation.
+"""
+import numpy as np
+import pytest
+from py_expression_eval import Parser
+
+from modules.functions.expressions import compile_expression, VECTOR_NAMESPACE
+
+FORMULAS = [
+    ("t*(1+0.15*(f/c)^4)", {"t": 2.5, "c": 100.0}),
+    ("a+b*f", {"a": 3.0, "b": 0.02}),
+    ("7", {}),
+    ("f^2-3*f+1", {}),
+    ("-f+10", {}),
+    ("f%7+2", {}),
+    ("sqrt(f)+exp(f/100)+log(f+1)+abs(f-50)", {}),
+    ("t*(1+a*(f/c)^b)", {"t": 1.0, "a": 0.15, "c": 40.0, "b": 4}),
+]
+FLOWS = [0.0, 1.0, 17.0, 100.0, 1234.5]
+
+
+@pytest.mark.parametrize("formula, constants", FORMULAS)
+def test_compiled_formula_matches_parser(formula, constants):
+    expression = Parser().parse(formula)
+    variables = ['f'] + sorted(constants)
+    function = compile_expression(expression, variables)
+    for flow in FLOWS:
+        values = dict(constants, f=flow)
+        expected = expression.evaluate(values)
+        assert function(*[values[name] for name in variables]) == pytest.approx(expected,
+                                                                                rel=1e-12)
+
+
+@pytest.mark.parametrize("formula, constants", FORMULAS)
+def test_vectorized_formula_matches_parser(formula, constants):
+    expression = Parser().parse(formula)
+    variables = ['f'] + sorted(constants)
+    function = compile_expression(expression, variables, VECTOR_NAMESPACE)
+    flows = np.array(FLOWS)
+    costs = np.broadcast_to(function(flows, *[constants[name] for name in variables[1:]]),
+                            flows.shape)
+    expected = [expression.evaluate(dict(constants, f=flow)) for flow in FLOWS]
+    np.testing.assert_allclose(costs, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("formula", ["f*-1", "(f/-3.0)^4", "f*g", "foo(f)"])
+def test_unsupported_formulas_raise_value_error(formula):
+    with pytest.raises(ValueError):
+        compile_expression(Parser().parse(formula), ['f'])
@@ -0,0 +1,44 @@
+"""
+The route-edge incidence and the incremental link flows against a driver by driver simulation.
+"""
+import numpy as np
+import pytest
+
+
+def random_actions(incidence, rng):
+    return (rng.random_sample(incidence.num_drivers) * incidence.driver_num_routes).astype(int)
+
+
+def test_travel_times_match_naive_simulation(experiment, naive):
+    incidence = experiment.incidence
+    rng = np.random.RandomState(1)
+    for _ in range(5):
+        actions = random_actions(incidence, rng)
+        expected = naive(experiment, actions)
+        np.testing.assert_allclose(incidence.travel_times(actions), expected, rtol=1e-12)
+        assert incidence.average_travel_time(actions) == pytest.approx(np.mean(expected),
+                                                                        rel=1e-12)
+
+
+def test_population_matches_single_solutions(experiment):
+    incidence = experiment.incidence
+    rng = np.random.RandomState(2)
+    population = np.array([random_actions(incidence, rng) for _ in range(6)])
+    np.testing.assert_allclose(incidence.population_average_travel_times(population),
+                               [incidence.average_travel_time(row) for row in population],
+                               rtol=1e-12)
+
+
+def test_incremental_flows_match_naive_simulation(experiment, naive):
+    from modules.experiment.incidence import IncrementalFlows
+    incidence = experiment.incidence
+    flows = IncrementalFlows(incidence)
+    rng = np.random.RandomState(3)
+    actions = random_actions(incidence, rng)
+    for step in range(20):
+        #a few drivers change route at each step, all of them now and then (rebuild)
+        count = incidence.num_drivers if step % 7 == 6 else 3
+        drivers = rng.choice(incidence.num_drivers, count, replace=False)
+        actions[drivers] = random_actions(incidence, rng)[drivers]
+        np.testing.assert_allclose(flows.travel_times(actions), naive(experiment, actions),
+                                   rtol=1e-12)
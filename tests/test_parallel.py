@@ -0,0 +1,35 @@
+"""
+The parallel evaluator against the serial evaluation of the population.
+"""
+import numpy as np
+
+
+def test_parallel_scores_are_identical(experiment):
+    from modules.genetic_algorithm.parallel import ParallelEvaluator
+    incidence = experiment.incidence
+    rng = np.random.RandomState(14)
+    evaluator = ParallelEvaluator(incidence, 2)
+    try:
+        #the buffers are reused, then grown for a larger population
+        for rows in (9, 9, 17):
+            population = (rng.random_sample((rows, incidence.num_drivers))
+                          * incidence.driver_num_routes).astype(np.uint8)
+            np.testing.assert_array_equal(evaluator(population),
+                                          incidence.population_average_travel_times(population))
+    finally:
+        evaluator.close()
+
+
+def test_parallel_route_counts_are_identical(experiment):
+    from modules.genetic_algorithm.parallel import ParallelEvaluator
+    incidence = experiment.incidence
+    rng = np.random.RandomState(15)
+    population = (rng.random_sample((8, incidence.num_drivers))
+                  * incidence.driver_num_routes).astype(int)
+    counts = np.array([incidence.route_counts(actions) for actions in population])
+    evaluator = ParallelEvaluator(incidence, 2, counts=True)
+    try:
+        np.testing.assert_array_equal(evaluator(counts),
+                                      incidence.population_counts_average_travel_times(counts))
+    finally:
+        evaluator.close()
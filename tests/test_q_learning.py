@@ -0,0 +1,75 @@
+"""
+The vectorized action selections of the QL drivers and the memory-mapped Q-table.
+"""
+import numpy as np
+import pytest
+
+DRAWS = 200
+
+
+def learner(experiment, **args):
+    from modules.q_learning.q_learning import QL
+    return QL(experiment, experiment.drivers, experiment.k, 0.9, 0.5, {}, **args)
+
+
+def frequencies(ql, select, values):
+    """
+    Frequency of each route chosen by the drivers having k routes, all of them with the given
+    Q-values.
+    """
+    drivers = np.flatnonzero(ql.num_routes == ql.k)
+    ql.qtable[drivers] = values
+    counts = np.zeros(ql.k)
+    for _ in range(DRAWS):
+        counts += np.bincount(select()[drivers], minlength=ql.k)
+    return counts / counts.sum()
+
+
+def test_epsilon_greedy_distribution(experiment):
+    ql = learner(experiment, epsilon=0.3)
+    np.random.seed(6)
+    expected = [0.7 + 0.1, 0.1, 0.1]
+    np.testing.assert_allclose(frequencies(ql, ql.select_epsilon, [0.0, -1.0, -2.0]), expected,
+                               atol=0.01)
+
+
+def test_epsilon_greedy_breaks_ties_at_random(experiment):
+    ql = learner(experiment, epsilon=0.0)
+    np.random.seed(7)
+    np.testing.assert_allclose(frequencies(ql, ql.select_epsilon, [-1.0, -5.0, -1.0]),
+                               [0.5, 0.0, 0.5], atol=0.01)
+
+
+@pytest.mark.parametrize("offset", [0.0, -1e6])
+def test_boltzmann_distribution(experiment, offset):
+    ql = learner(experiment, action_selection="boltzmann", temperature=2.0)
+    np.random.seed(8)
+    values = np.array([0.0, -1.0, -4.0])
+    expected = np.exp(values / 2.0) / np.sum(np.exp(values / 2.0))
+    with np.errstate(all='raise'):
+        found = frequencies(ql, ql.select_boltzmann, values + offset)
+    np.testing.assert_allclose(found, expected, atol=0.01)
+
+
+def test_boltzmann_near_zero_temperature_is_greedy(experiment):
+    ql = learner(experiment, action_selection="boltzmann", temperature=1e-300)
+    np.random.seed(9)
+    np.testing.assert_allclose(frequencies(ql, ql.select_boltzmann, [-3.0, -2.0, -2.0]),
+                               [0.0, 0.5, 0.5], atol=0.01)
+
+
+def test_memmap_table_reload(experiment, tmp_path):
+    path = str(tmp_path / "qtable.npy")
+    np.random.seed(10)
+    ql = learner(experiment, iniTable="random", MINI=-1.0, MAX=0.0, qtable_file=path,
+                 chunk_size=50)
+    for _ in range(3):
+        ql.runEpisode()
+    ql.save_table()
+    table = np.array(ql.qtable)
+
+    loaded = learner(experiment, qtable_file=path, qtable_load=True, chunk_size=50)
+    assert isinstance(loaded.qtable, np.memmap)
+    np.testing.assert_array_equal(loaded.qtable, table)
+    with pytest.raises(ValueError):
+        learner(experiment, qtable_file=path, qtable_load=True, qtable_dtype="float32")
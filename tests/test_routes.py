@@ -0,0 +1,87 @@
+"""
+The route sets kept in the cache on disk.
+"""
+import numpy as np
+import pytest
+
+
+def same_routes(found, expected):
+    assert len(found) == len(expected)
+    for od_found, od_expected in zip(found, expected):
+        assert [path[0] for path in od_found] == [path[0] for path in od_expected]
+        np.testing.assert_allclose([path[1] for path in od_found],
+                                   [path[1] for path in od_expected], rtol=1e-12)
+
+
+def test_pack_round_trip(experiment):
+    from modules.experiment import routes
+    expected = [od_pair.paths for od_pair in experiment.ODlist]
+    same_routes(routes.unpack_routes(routes.pack_routes(experiment.ODlist, expected)), expected)
+
+
+def test_cache_round_trip(experiment, grid_file, tmp_path, monkeypatch):
+    from modules.experiment import routes
+    cache = routes.RouteCache(str(tmp_path / "cache"), grid_file, experiment.k, 0)
+    assert cache.load(experiment.ODlist) is None
+    computed = cache.routes(experiment.Vo, experiment.Eo, experiment.ODlist)
+    same_routes(computed, [od_pair.paths for od_pair in experiment.ODlist])
+
+    #the second time the routes come from the file
+    def no_ksp(*args):
+        raise AssertionError("the routes were computed again")
+    monkeypatch.setattr(routes, "k_routes", no_ksp)
+    same_routes(cache.routes(experiment.Vo, experiment.Eo, experiment.ODlist), computed)
+    #other OD pairs are a miss
+    assert cache.load(experiment.ODlist[1:]) is None
+
+
+def test_foreign_file_is_a_miss(experiment, grid_file, tmp_path):
+    from modules.experiment import routes
+    cache = routes.RouteCache(str(tmp_path), grid_file, experiment.k, 0)
+    np.savez(cache.filename, something=np.arange(3))
+    assert cache.load(experiment.ODlist) is None
+    with open(cache.filename, 'w') as broken:
+        broken.write("not a npz file")
+    assert cache.load(experiment.ODlist) is None
+
+
+def test_cache_name_follows_the_network(ksp, grid_file, tmp_path):
+    from modules.experiment import routes
+    before = routes.RouteCache(str(tmp_path), grid_file, 3, 0).filename
+    assert routes.RouteCache(str(tmp_path), grid_file, 4, 0).filename != before
+    assert routes.RouteCache(str(tmp_path), grid_file, 3, 0, "batched").filename != before
+    with open(grid_file, 'a') as network:
+        network.write("node extra\n")
+    assert routes.RouteCache(str(tmp_path), grid_file, 3, 0).filename != before
+
+
+def test_experiment_with_cache(experiment, grid_file, tmp_path):
+    from modules.experiment.experiment import Experiment
+    for _ in range(2):
+        cached = Experiment(3, grid_file, 1, route_cache=str(tmp_path))
+        same_routes([od_pair.paths for od_pair in cached.ODlist],
+                    [od_pair.paths for od_pair in experiment.ODlist])
+
+
+def test_workers_give_the_same_routes(experiment):
+    from modules.experiment import routes
+    serial = routes.k_routes(experiment.Vo, experiment.Eo, experiment.ODlist)
+    same_routes(routes.k_routes(experiment.Vo, experiment.Eo, experiment.ODlist, workers=2),
+                serial)
+
+
+def test_batched_routes_match_ksp(ksp, grid_file):
+    from modules.experiment import routes
+    from modules.experiment.experiment import Experiment
+    #with random costs no two routes cost the same, so both methods find the same routes
+    experiment = Experiment(5, grid_file, 1)
+    same_routes(routes.k_routes(experiment.Vo, experiment.Eo, experiment.ODlist,
+                                method="batched"),
+                [od_pair.paths for od_pair in experiment.ODlist])
+
+
+def test_batched_needs_unique_edge_names(experiment):
+    from modules.experiment import routes
+    experiment.Eo[1].name = experiment.Eo[0].name
+    with pytest.raises(Exception, match="unique edge names"):
+        routes.k_routes(experiment.Vo, experiment.Eo, experiment.ODlist, method="batched")
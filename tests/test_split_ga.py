@@ -0,0 +1,54 @@
+"""
+The route-split GA keeps the demand of every OD pair.
+"""
+import numpy as np
+
+
+def od_demand(engine, genomes):
+    genomes = np.atleast_2d(genomes).astype(np.int64)
+    return np.array([np.bincount(engine.route_od, weights=genome,
+                                 minlength=engine.incidence.num_ods) for genome in genomes])
+
+
+def split_engine(experiment, step_callback=None, mutation=0.05):
+    from modules.genetic_algorithm.split_ga import RouteSplitGA
+    incidence = experiment.incidence
+    return RouteSplitGA(incidence, 10, 12, 0.8, mutation, 2, None, step_callback,
+                        batch_evaluator=incidence.population_counts_average_travel_times,
+                        stop_on_convergence=False)
+
+
+def test_random_population_and_mutation_keep_demand(experiment):
+    engine = split_engine(experiment)
+    np.random.seed(11)
+    population = engine.random_population(20)
+    np.testing.assert_array_equal(od_demand(engine, population),
+                                  np.tile(engine.demand, (20, 1)))
+    engine.mutate(population, 0.3)
+    np.testing.assert_array_equal(od_demand(engine, population),
+                                  np.tile(engine.demand, (20, 1)))
+
+
+def test_generations_keep_demand(experiment):
+    checked = []
+
+    def check(engine):
+        np.testing.assert_array_equal(od_demand(engine, engine.population),
+                                      np.tile(engine.demand, (engine.population_size, 1)))
+        checked.append(engine.current_generation)
+        return False
+
+    np.random.seed(12)
+    engine = split_engine(experiment, check, mutation=0.2)
+    engine.evolve()
+    assert len(checked) >= 12
+
+
+def test_actions_round_trip(experiment):
+    incidence = experiment.incidence
+    engine = split_engine(experiment)
+    np.random.seed(13)
+    genome = engine.random_population(1)[0]
+    actions = engine.to_actions(genome)
+    assert np.all(actions < incidence.driver_num_routes)
+    np.testing.assert_array_equal(engine.from_actions(actions), genome)